@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+bench.py
+
+Throughput and memory benchmarks of the netdot client against
+benchmarks/fake_server.py.  Results are printed (or written) as JSON;
+with --baseline the run fails when a benchmark got slower than the
+baseline by more than --tolerance.
+
+Usage:
+  python benchmarks/bench.py --rows 100000 --latency 0.002 --output bench.json
+  python benchmarks/bench.py --rows 100000 --baseline bench.json
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from io import BytesIO
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import netdot
+import fake_server
+
+def measure(func, repeat):
+    """
+    Runs func repeat times and returns the best time in seconds
+    and the value returned by func.  When tracemalloc is
+    available func is run once more, untimed, to record the peak
+    memory it allocates.
+    """
+    peak = None
+    if tracemalloc:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result, peak
+
+def synthetic_xml(rows):
+    table = fake_server.build_tables(rows)['interface']
+    return b'<opt>' + b''.join(table.rows) + b'</opt>'
+
+def startup(statement):
+    """
+    Returns a func running statement in a fresh interpreter, to
+    time how long short-lived scripts take to start
+    """
+    code = 'import sys; sys.path.insert(0, %r); %s' % (ROOT, statement)
+    def func():
+        subprocess.check_call([sys.executable, '-c', code])
+        return 1
+    return func
+
+def benchmarks(dot, args):
+    """
+    Returns (name, func) pairs; each func returns the number
+    of rows or calls it handled
+    """
+    xml = synthetic_xml(args.rows)
+    devices = max(1, args.rows // fake_server.PORTS)
+    ids = [str(i) for i in range(1, args.calls + 1)]
+    hosts = [{'name': 'bench%d' % i, 'subnet': '10.%d.0.0/16' % (i % 16)}
+             for i in range(args.calls)]
+    return [
+        ('startup_python', startup('pass')),
+        ('startup_netdot', startup('import netdot')),
+        ('startup_util', startup("import netdot; netdot.Util.parse_xml(b'<opt/>')")),
+        ('startup_client', startup('import netdot.Client')),
+        ('parse_xml', lambda: len(netdot.Util.parse_xml(xml)['Interface'])),
+        ('parse_xml_compact',
+         lambda: len(netdot.Util.parse_xml(xml, compact=True)['Interface'])),
+        ('iter_xml', lambda: sum(1 for item in
+                                 netdot.Util.iter_xml(BytesIO(xml)))),
+        ('get', lambda: len(dot.get('/interface')['Interface'])),
+        ('get_stream', lambda: sum(1 for item in dot.get('/interface', stream=True))),
+        ('iter_objects', lambda: sum(1 for item in
+                                     dot.iter_objects('interface', page_size=args.page_size))),
+        ('get_device_vlans_serial',
+         lambda: len(dot.get_device_vlans(str(devices), workers=1)['Device'][str(devices)])),
+        ('get_device_vlans', lambda: len(dot.get_device_vlans(str(devices))['Device'][str(devices)])),
+        ('get_many', lambda: len(dot.get_many('rr', ids)[0].get('RR', {}))),
+        ('create_hosts', lambda: sum(1 for outcome in dot.create_hosts(hosts))),
+        ('delete_many', lambda: len(dot.delete_many('host', ids)[0])),
+    ]
+
+def run(args):
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=fake_server.serve,
+                                     args=(args.rows, args.latency, 0, ready))
+    server.daemon = True
+    server.start()
+    try:
+        url = ready.get(timeout=600)
+        dot = netdot.Client.Connect('bench', 'bench', url, workers=args.workers)
+        results = {}
+        for name, func in benchmarks(dot, args):
+            if args.only and name not in args.only:
+                continue
+            seconds, count, peak = measure(func, args.repeat)
+            results[name] = {'seconds': round(seconds, 6),
+                             'count': count,
+                             'per_second': round(count / seconds, 1) if seconds else None,
+                             'peak_bytes': peak}
+            sys.stderr.write('%-24s %10.4fs %10s/s\n' % (name, seconds,
+                                                        results[name]['per_second']))
+        return {'meta': {'python': platform.python_version(),
+                         'rows': args.rows,
+                         'latency': args.latency,
+                         'workers': args.workers,
+                         'calls': args.calls,
+                         'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                'results': results}
+    finally:
+        server.terminate()
+
+def regressions(report, baseline, tolerance):
+    """
+    Returns the names of benchmarks slower than in baseline by
+    more than tolerance (a fraction)
+    """
+    slower = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base and result['seconds'] > base['seconds'] * (1 + tolerance):
+            slower.append(name)
+    return sorted(slower)
+
+def main():
+    parser = argparse.ArgumentParser(description='netdot client benchmarks')
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='Interface/InterfaceVlan/RR rows served')
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='Simulated server latency per request, in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=200,
+                        help='Items handled by the bulk benchmarks')
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*', help='Benchmarks to run')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(report, json.load(f), args.tolerance)
+        if slower:
+            sys.stderr.write('Slower than baseline: %s\n' % ', '.join(slower))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+fake_server.py
+
+Local stand-in for the NetDot REST interface serving synthetic data.
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+
+import sys
+import time
+import threading
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qsl
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qsl
+
+# Interfaces per synthetic device, and number of synthetic VLANs
+PORTS = 48
+VLANS = 200
+
+def row(tag, attrib):
+    return ('<%s %s />' % (tag, ' '.join('%s="%s"' % item
+                                         for item in sorted(attrib.items())))).encode('utf-8')
+
+class Table(object):
+  def __init__(self, tag, rows, indexed):
+      """
+      Pre-rendered rows of one synthetic object class, with an
+      index on each of the indexed fields
+      """
+      self.tag = tag
+      self.rows = [row(tag, attrib) for attrib in rows]
+      self.indexes = dict((field, {}) for field in ('id',) + indexed)
+      for position, attrib in enumerate(rows):
+          for field, index in self.indexes.items():
+              index.setdefault(attrib[field], []).append(position)
+
+def build_tables(rows):
+    """
+    Builds rows Interface, InterfaceVlan and RR rows, plus the
+    Device, Vlan and Ipblock rows they refer to
+    """
+    devices = max(1, rows // PORTS)
+    tables = {}
+    tables['device'] = Table('Device', [
+        {'id': str(d), 'name': 'switch%d' % d, 'snmp_managed': '1',
+         'info': 'Synthetic device'} for d in range(1, devices + 1)], ('name',))
+    tables['interface'] = Table('Interface', [
+        {'id': str(i), 'name': 'GigabitEthernet1/0/%d' % ((i - 1) % PORTS + 1),
+         'device': str((i - 1) // PORTS % devices + 1),
+         'device_xlink': 'Device/%d' % ((i - 1) // PORTS % devices + 1),
+         'oper_status': 'up', 'admin_status': 'up', 'speed': '1000000000',
+         'type': 'ethernetCsmacd', 'snmp_index': str(i)}
+        for i in range(1, rows + 1)], ('device', 'name'))
+    tables['interfacevlan'] = Table('InterfaceVlan', [
+        {'id': str(i), 'interface': str(i), 'interface_xlink': 'Interface/%d' % i,
+         'vlan': str(i % VLANS + 1), 'vlan_xlink': 'Vlan/%d' % (i % VLANS + 1)}
+        for i in range(1, rows + 1)], ('interface', 'vlan'))
+    tables['vlan'] = Table('Vlan', [
+        {'id': str(v), 'vid': str(v), 'name': 'vlan%d' % v, 'vlangroup': '1'}
+        for v in range(1, VLANS + 1)], ('vlangroup',))
+    tables['rr'] = Table('RR', [
+        {'id': str(i), 'name': 'host%d' % i, 'zone': 'example.com',
+         'zone_xlink': 'Zone/1', 'active': '1', 'info': ''}
+        for i in range(1, rows + 1)], ('name',))
+    tables['ipblock'] = Table('Ipblock', [
+        {'id': str(i), 'address': '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255),
+         'prefix': '32', 'version': '4', 'status': 'Static'}
+        for i in range(1, rows + 1)], ('address',))
+    return tables
+
+class Handler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+  # Headers and body are written separately; without TCP_NODELAY
+  # keep-alive requests would stall on delayed ACKs
+  disable_nagle_algorithm = True
+
+  def log_message(self, *args):
+      pass
+
+  def send(self, status, body, headers=()):
+      self.send_response(status)
+      for name, value in headers:
+          self.send_header(name, value)
+      self.send_header('Content-Type', 'text/xml')
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+  def read_body(self):
+      length = int(self.headers.get('Content-Length') or 0)
+      return self.rfile.read(length)
+
+  def do_POST(self):
+      self.read_body()
+      time.sleep(self.server.latency)
+      if self.path.endswith('/NetdotLogin'):
+          return self.send(200, b'ok', [('Set-Cookie', 'netdot_auth=bench; Path=/')])
+      with self.server.lock:
+          self.server.created += 1
+          id = self.server.created
+      return self.send(200, ('<opt id="%d" name="created%d" />' % (id, id)).encode('utf-8'))
+
+  def do_DELETE(self):
+      time.sleep(self.server.latency)
+      return self.send(200, b'')
+
+  def do_GET(self):
+      time.sleep(self.server.latency)
+      url = urlparse(self.path)
+      name = url.path.rstrip('/').rsplit('/', 1)[-1]
+      if name == 'host':
+          name = 'rr'
+      table = self.server.tables.get(name)
+      if table is None:
+          return self.send(404, b'Not found')
+      params = dict(parse_qsl(url.query))
+      limit = int(params.pop('limit', 0)) or None
+      offset = int(params.pop('offset', 0))
+      positions = None
+      for field, value in params.items():
+          matches = table.indexes.get(field, {}).get(value, [])
+          if positions is None:
+              positions = matches
+          else:
+              matches = set(matches)
+              positions = [p for p in positions if p in matches]
+      if positions is None:
+          rows = table.rows[offset:offset + limit if limit else None]
+      else:
+          rows = [table.rows[p] for p in positions][offset:offset + limit if limit else None]
+      if not rows:
+          # NetDot answers 404 when no rows match, including a
+          # page past the end of the table
+          return self.send(404, b'Not found')
+      return self.send(200, b'<opt>' + b''.join(rows) + b'</opt>')
+
+class Server(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+def serve(rows, latency=0.0, port=0, ready=None):
+    """
+    Runs a fake NetDot server on 127.0.0.1 until the process
+    is killed.  When ready is a queue, the server url is put on
+    it once the server is listening.
+    """
+    server = Server(('127.0.0.1', port), Handler)
+    server.tables = build_tables(rows)
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.created = 0
+    url = 'http://127.0.0.1:%d/netdot' % server.server_address[1]
+    if ready is not None:
+        ready.put(url)
+    else:
+        print(url)
+        sys.stdout.flush()
+    server.serve_forever()
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+    serve(args.rows, args.latency, args.port)
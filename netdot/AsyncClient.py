@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+AsyncClient.py
+
+asyncio counterpart of netdot.Client.  Requires Python 3 and aiohttp.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import ssl
+import asyncio
+import aiohttp
+from netdot import Util
+from netdot.Client import __version__
+
+class AsyncConnect(object):
+  def __init__(self, username, password, server, verify = False, debug = 0,
+               limit = 100, limit_per_host = 0, timeout = 10,
+               coalesce = False):
+      """
+      Class constructor.  Mirrors netdot.Client.Connect, but the
+      HTTP session is only opened (and the login performed) when
+      the object is entered as an async context manager or when
+      connect() is awaited.  Every other coroutine takes the same
+      arguments and returns the same data as the Connect method of
+      the same name.
+
+      Arguments:
+        verify -- False, True or the path to a CA bundle
+        limit -- Maximum number of simultaneous connections
+        limit_per_host -- Maximum simultaneous connections per host
+                          (0 means no separate limit)
+        timeout -- Total timeout of a single request, in seconds
+        coalesce -- Share one request between concurrent get() or
+                    get_xml() calls for the same url.  The callers
+                    then receive the same result object, which must
+                    not be modified.
+
+      Usage:
+        import netdot.AsyncClient
+        async with netdot.AsyncClient.AsyncConnect(username,
+                                                   password,
+                                                   "https://netdot.localdomain/netdot") as dot:
+          host = await dot.get_host_by_name("foo")
+
+      Returns: netdot.AsyncClient.AsyncConnect object.
+      """
+      self.debug = bool(debug)
+      if self.debug:
+        print("DEBUG MODE: ON")
+      self.http = None
+      self.username = username
+      self.password = password
+      self.verify = verify
+
+      self.server = server
+      self.base_url = server + '/rest'
+      self.login_url = server + '/NetdotLogin'
+      self.timeout = timeout
+      self.limit = limit
+      self.limit_per_host = limit_per_host
+      self.workers = 8
+      self.flights = {} if coalesce else None
+      self.version = __version__
+      self.headers = { 'User_Agent':'Netdot::Client::REST/self.version',
+                       'Accept':'text/xml; version=1.0'}
+
+  async def __aenter__(self):
+      await self.connect()
+      return self
+
+  async def __aexit__(self, *exc):
+      await self.close()
+
+  def _ssl(self):
+      if self.verify is True:
+        return None
+      if not self.verify:
+        return False
+      return ssl.create_default_context(cafile=self.verify)
+
+  async def connect(self):
+      """
+      Opens the HTTP session and logs into the NetDot API.
+      """
+      connector = aiohttp.TCPConnector(limit=self.limit,
+                                       limit_per_host=self.limit_per_host,
+                                       ssl=self._ssl())
+      # unsafe=True keeps cookies handed out by servers addressed by IP
+      self.http = aiohttp.ClientSession(
+          connector=connector,
+          headers=self.headers,
+          cookie_jar=aiohttp.CookieJar(unsafe=True),
+          timeout=aiohttp.ClientTimeout(total=self.timeout))
+      await self._login(self.username, self.password)
+
+  async def close(self):
+      """
+      Closes the HTTP session and its connection pool.
+      """
+      if self.http is not None:
+        await self.http.close()
+        self.http = None
+
+  async def _login(self, username, password):
+      """
+      Internal Function. Logs into the NetDot API with provided credentials,
+      the Apache generated cookies are kept in the session cookie jar.
+      """
+      params = {'destination':'index.html',
+                  'credential_0':username,
+                  'credential_1':password,
+                  'permanent_session':1}
+      async with self.http.post(self.login_url, data=params) as response:
+        if response.status != 200:
+          raise AttributeError('Invalid Credentials')
+
+  async def logout(self):
+      """
+      Logout of the NetDot API
+      """
+      async with self.http.post(self.server + '/logout.html') as response:
+        pass
+
+  async def _request(self, method, url, **kwargs):
+      async with self.http.request(method, self.base_url + url, **kwargs) as response:
+        content = await response.read()
+        if self.debug:
+          Util.dump(response)
+        response.raise_for_status()
+        return content
+
+  async def get_xml(self, url):
+      """
+      Returns the XML string output from Netdot for url.
+
+      Usage:
+        response = await dot.get_xml("/url")
+      """
+      return await self._coalesce(('xml', url), self._request, 'GET', url)
+
+  async def get(self, url):
+      """
+      Delegates to get_xml() and parses the response xml with
+      Util.parse_xml, so results are identical to Connect.get().
+
+      Usage:
+        dict = await dot.get("/url")
+      """
+      return await self._coalesce(('get', url), self._get, url)
+
+  async def _get(self, url):
+      return Util.parse_xml(await self.get_xml(url))
+
+  async def _coalesce(self, key, func, *args):
+      """
+      Awaits func(*args), or the identical call already in flight
+      for key when coalescing is enabled.  The shared call is
+      shielded, so one caller being cancelled does not cancel it
+      for the others.
+      """
+      if self.flights is None:
+        return await func(*args)
+      task = self.flights.get(key)
+      if task is None:
+        task = self.flights[key] = asyncio.ensure_future(func(*args))
+        task.add_done_callback(lambda task: self.flights.pop(key, None))
+      return await asyncio.shield(task)
+
+  async def post(self, url, data):
+      """
+      Posts form data to url.
+
+      Usage:
+        response = await dot.post("/url", {form-data})
+      """
+      content = await self._request('POST', url, data=data)
+      Util.validate_xml(content)
+      return content
+
+  async def delete(self, url):
+      """
+      Sends a DELETE request to url.
+
+      Usage:
+        response = await dot.delete("/url")
+      """
+      return await self._request('DELETE', url)
+
+  async def get_host_by_ipid(self, id):
+      return await self.get(Util.query_url('host', {'ipid': id}))
+
+  async def get_host_by_rrid(self, id):
+      return await self.get(Util.query_url('host', {'rrid': id}))
+
+  async def get_host_by_name(self, name):
+      return await self.get(Util.query_url('host', {'name': name}))
+
+  async def get_ipblock(self, ipblock):
+      return await self.get(Util.query_url('host', {'subnet': ipblock}))
+
+  async def get_host_address(self, address):
+      return await self.get(Util.query_url('host', {'address': address}))
+
+  async def get_person_by_username(self, user):
+      return await self.get(Util.query_url('person', {'username': user}))
+
+  async def get_person_by_id(self, id):
+      person = dict()
+      for child in Util.ET.fromstring(await self.get_xml(Util.query_url('person', {'id': id}))):
+        person[id] = child.attrib
+      return person
+
+  async def create_object(self, object, data):
+      return await self.post("/" + object, data)
+
+  async def get_object_by_id(self, object, id):
+      return await self.get(Util.query_url(object, {'id': id}))
+
+  async def get_object_by_name(self, object, name):
+      return await self.get(Util.query_url(object, {'name': name}))
+
+  async def get_object_by_desc(self, object, desc):
+      return await self.get(Util.query_url(object, {'description': desc}))
+
+  async def get_object_by_info(self, object, info):
+      return await self.get(Util.query_url(object, {'info': info}))
+
+  async def get_object_by_filter(self, object, field, value):
+      return await self.get(Util.query_url(object, {field: value}))
+
+  async def delete_object_by_id(self, object, id):
+      return await self.delete("/" + object + "/" + id)
+
+  async def create_host(self, data):
+      return await self.post("/host", data)
+
+  async def delete_host_by_rrid(self, id):
+      return await self.delete(Util.query_url('host', {'rrid': id}))
+
+  async def delete_host_by_ipid(self, id):
+      return await self.delete(Util.query_url('host', {'ipid': id}))
+
+  async def get_vlans_by_groupid(self, id):
+      return await self.get(Util.query_url('vlan', {'VlanGroup': id}))
+
+  async def get_grouprights_by_conlist_id(self, id):
+      return await self.get(Util.query_url('groupright', {'contactlist': id}))
+
+  async def get_device_vlans(self, device, workers=None):
+      """
+      Coroutine version of Connect.get_device_vlans().  At most
+      workers interfacevlan lookups are in flight at once.
+
+      Returns:
+        Multi-level dictionary on success
+      """
+      semaphore = asyncio.Semaphore(workers or self.workers)
+      dev_ifaces = await self.get_object_by_filter('interface', 'device', device)
+
+      async def get_iface_vlans(iface):
+          async with semaphore:
+              try:
+                  return await self.get_object_by_filter('interfacevlan', 'interface', iface)
+              except aiohttp.ClientResponseError:
+                  # SVI interfaces don't have a Vlan because they are Vlans
+                  return {}
+
+      dev_vlans = []
+      for iface_vlans in await asyncio.gather(
+              *[get_iface_vlans(iface) for iface in dev_ifaces['Interface'].keys()]):
+          for iv in iface_vlans.get('InterfaceVlan', {}).values():
+              if iv['vlan'] not in dev_vlans:
+                  dev_vlans.append(iv['vlan'])
+
+      return {"Device": {
+                device : dev_vlans
+                }
+              }
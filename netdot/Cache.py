@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Cache.py
+
+Response caches for netdot.Client.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import time
+import threading
+from collections import OrderedDict, namedtuple
+
+# Writes to one of these object types also change what the
+# others return (the /host resource is a view over RR and Ipblock)
+RELATED_OBJECTS = {
+    'host': ('rr', 'ipblock'),
+    'rr': ('host',),
+    'ipblock': ('host',),
+}
+
+CachedResponse = namedtuple('CachedResponse',
+                            'content etag last_modified fresh')
+
+def object_type(url):
+    """
+    Returns the lower-cased object type of a REST url,
+    e.g. 'host' for '/host?name=foo' or 'device' for '/device/12'
+    """
+    return url.lstrip('/').split('?', 1)[0].split('/', 1)[0].lower()
+
+def generation(generations, url):
+    """
+    Returns the write generation of the object type of url in a
+    cache's generations dict: a counter bumped by bump() on every
+    invalidation of the type (None counting for every type)
+    """
+    return (generations.get(None, 0), generations.get(object_type(url), 0))
+
+def bump(generations, object):
+    """
+    Bumps the write generation of an object type, and of the
+    related types, or of every type when object is None
+    """
+    if object is None:
+        objects = (None,)
+    else:
+        objects = (object,) + RELATED_OBJECTS.get(object, ())
+    for object in objects:
+        generations[object] = generations.get(object, 0) + 1
+
+def stale(generations, url, start):
+    """
+    Tells whether a response fetched when the generation of url
+    was start may predate a write
+    """
+    return start is not None and start != generation(generations, url)
+
+class SingleFlight(object):
+  def __init__(self):
+      """
+      Coalesces concurrent identical calls: while a call for a key
+      is in flight, other threads calling with the same key wait
+      for it and share its result (or exception) instead of
+      repeating it.  Nothing is kept once the call completes.
+
+      Usage:
+        flights = netdot.Cache.SingleFlight()
+        result = flights.do(url, fetch, url)
+
+      Returns: netdot.Cache.SingleFlight object.
+      """
+      self._calls = {}
+      self._lock = threading.Lock()
+
+  def do(self, key, func, *args):
+      """
+      Returns func(*args), or the result of the identical call
+      already in flight for key
+      """
+      with self._lock:
+          call = self._calls.get(key)
+          leader = call is None
+          if leader:
+              call = self._calls[key] = {'event': threading.Event()}
+      if not leader:
+          call['event'].wait()
+          if 'error' in call:
+              raise call['error']
+          return call['result']
+      try:
+          call['result'] = func(*args)
+          return call['result']
+      except Exception as e:
+          call['error'] = e
+          raise
+      finally:
+          with self._lock:
+              del self._calls[key]
+          call['event'].set()
+
+class ResponseCache(object):
+  def __init__(self, maxsize=1024, ttl=300, ttls=None):
+      """
+      In-memory, size-bounded LRU cache of GET responses.  Entries
+      expire after a per-object-type TTL.  Like DiskCache, entries
+      are keyed by the REST base url and username of the client
+      as well as by url, so clients of different servers or users
+      sharing a cache never see each other's responses.
+
+      Arguments:
+        maxsize -- Maximum number of cached responses
+        ttl -- Default time to live in seconds
+        ttls -- dict of object type to TTL overriding the default,
+                e.g. {'vlan': 3600, 'host': 30}.  A TTL of 0
+                disables caching for that type.
+
+      Usage:
+        cache = netdot.Cache.ResponseCache(maxsize=4096, ttls={'host': 30})
+        dot = netdot.Client.Connect(username, password, server, cache=cache)
+
+      Returns: netdot.Cache.ResponseCache object.
+      """
+      self.maxsize = maxsize
+      self.ttl = ttl
+      self.ttls = dict(ttls or {})
+      self.hits = 0
+      self.misses = 0
+      self._entries = OrderedDict()
+      self._generations = {}
+      self._lock = threading.Lock()
+
+  def get(self, url, server='', username=''):
+      """
+      Returns the cached response for url, as stored for the
+      given REST base url and username, or None
+      """
+      key = (server, username, url)
+      with self._lock:
+          entry = self._entries.pop(key, None)
+          if entry is None or entry[0] < time.time():
+              self.misses += 1
+              return None
+          # re-insert to mark as most recently used
+          self._entries[key] = entry
+          self.hits += 1
+          return entry[2]
+
+  def generation(self, url):
+      """
+      Returns the write generation of the object type of url;
+      see set()
+      """
+      return generation(self._generations, url)
+
+  def set(self, url, value, server='', username='', generation=None):
+      """
+      Stores the response for url, as fetched from the given REST
+      base url by username, evicting the least recently used
+      entries when the cache is full.  When the
+      generation() read before fetching the response is given,
+      the response is not stored if a write invalidated its
+      object type meanwhile, as it may predate the write.
+      """
+      object = object_type(url)
+      ttl = self.ttls.get(object, self.ttl)
+      if ttl <= 0:
+          return
+      with self._lock:
+          if stale(self._generations, url, generation):
+              return
+          key = (server, username, url)
+          self._entries.pop(key, None)
+          self._entries[key] = (time.time() + ttl, object, value)
+          while len(self._entries) > self.maxsize:
+              self._entries.popitem(last=False)
+
+  def invalidate(self, object=None, server=None):
+      """
+      Drops every entry of the given object type (and of
+      related types), or the whole cache when object is None.
+      With server given, only the entries stored for that REST
+      base url are dropped, whatever their username.
+      """
+      with self._lock:
+          bump(self._generations, object)
+          if object is None and server is None:
+              self._entries.clear()
+              return
+          objects = None
+          if object is not None:
+              objects = set((object,) + RELATED_OBJECTS.get(object, ()))
+          for key in [key for key, entry in self._entries.items()
+                      if (objects is None or entry[1] in objects) and
+                         (server is None or key[0] == server)]:
+              del self._entries[key]
+
+  def stats(self):
+      """
+      Returns a dict with the hit and miss counters and
+      the current number of entries
+      """
+      return {'hits': self.hits,
+              'misses': self.misses,
+              'size': len(self._entries)}
+
+class DiskCache(object):
+  def __init__(self, path, ttl=300, ttls=None):
+      """
+      Persistent cache of GET responses stored in an sqlite file,
+      so that it survives between runs and can be shared by
+      several processes.  The raw XML is stored together with the
+      ETag and Last-Modified headers of the response.  Responses
+      carrying either header are revalidated with a conditional
+      request on every use; the others are served from disk until
+      their TTL expires.
+
+      Entries are keyed by the REST base url and username of the
+      client as well as by url, so clients of different servers
+      or users sharing a file never see each other's responses.
+
+      Arguments:
+        path -- sqlite database file, created if missing
+        ttl -- Default time to live in seconds for responses
+               without validators
+        ttls -- dict of object type to TTL overriding the default.
+                A TTL of 0 disables caching for that type.
+
+      Usage:
+        cache = netdot.Cache.DiskCache('/var/cache/netdot.sqlite', ttls={'vlan': 86400})
+        dot = netdot.Client.Connect(username, password, server, disk_cache=cache)
+
+      Returns: netdot.Cache.DiskCache object.
+      """
+      self.path = path
+      self.ttl = ttl
+      self.ttls = dict(ttls or {})
+      self.hits = 0
+      self.misses = 0
+      self.revalidated = 0
+      self._generations = {}
+      self._lock = threading.Lock()
+      # Imported here, as only disk caches need sqlite
+      import sqlite3
+      self._binary = sqlite3.Binary
+      self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+      with self._db:
+          self._db.execute("""CREATE TABLE IF NOT EXISTS response (
+                                server TEXT,
+                                username TEXT,
+                                url TEXT,
+                                object TEXT,
+                                content BLOB,
+                                etag TEXT,
+                                last_modified TEXT,
+                                stored REAL,
+                                PRIMARY KEY (server, username, url))""")
+          self._db.execute("""CREATE INDEX IF NOT EXISTS response_object
+                              ON response (server, object)""")
+
+  def _ttl(self, url):
+      return self.ttls.get(object_type(url), self.ttl)
+
+  def get(self, url, server='', username=''):
+      """
+      Returns a CachedResponse for url, as stored for the given
+      REST base url and username, or None.  A fresh entry may be
+      used as is; otherwise conditional_headers() gives the
+      headers needed to revalidate it.
+      """
+      if self._ttl(url) <= 0:
+          return None
+      with self._lock:
+          row = self._db.execute("""SELECT content, etag, last_modified, stored
+                                    FROM response
+                                    WHERE server = ? AND username = ? AND url = ?""",
+                                 (server, username, url)).fetchone()
+          if row is None:
+              self.misses += 1
+              return None
+          content, etag, last_modified, stored = row
+          fresh = (not etag and not last_modified and
+                   stored + self._ttl(url) > time.time())
+          if fresh:
+              self.hits += 1
+          elif not etag and not last_modified:
+              self.misses += 1
+              return None
+          return CachedResponse(bytes(content), etag, last_modified, fresh)
+
+  def conditional_headers(self, entry):
+      """
+      Returns the If-None-Match/If-Modified-Since headers
+      revalidating a CachedResponse
+      """
+      headers = {}
+      if entry.etag:
+          headers['If-None-Match'] = entry.etag
+      if entry.last_modified:
+          headers['If-Modified-Since'] = entry.last_modified
+      return headers
+
+  def generation(self, url):
+      """
+      Returns the write generation of the object type of url;
+      see ResponseCache.set()
+      """
+      return generation(self._generations, url)
+
+  def set(self, url, content, etag=None, last_modified=None,
+          server='', username='', generation=None):
+      """
+      Stores the response for url with its validators, unless
+      a write in this process invalidated its object type since
+      the given generation() was read
+      """
+      if self._ttl(url) <= 0:
+          return
+      with self._lock:
+          if stale(self._generations, url, generation):
+              return
+          with self._db:
+              self._db.execute("""INSERT OR REPLACE INTO response
+                                  VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                               (server, username, url, object_type(url),
+                                self._binary(content), etag, last_modified,
+                                time.time()))
+
+  def touch(self, url, server='', username=''):
+      """
+      Records a successful revalidation (304 Not Modified) of url
+      """
+      with self._lock:
+          self.hits += 1
+          self.revalidated += 1
+          with self._db:
+              self._db.execute("""UPDATE response SET stored = ?
+                                  WHERE server = ? AND username = ? AND url = ?""",
+                               (time.time(), server, username, url))
+
+  def invalidate(self, object=None, server=None):
+      """
+      Drops every entry of the given object type (and of
+      related types), or the whole cache when object is None.
+      With server given, only the entries stored for that REST
+      base url are dropped, whatever their username.
+      """
+      where = []
+      args = ()
+      if object is not None:
+          objects = (object,) + RELATED_OBJECTS.get(object, ())
+          where.append("object IN (%s)" % ", ".join("?" * len(objects)))
+          args += objects
+      if server is not None:
+          where.append("server = ?")
+          args += (server,)
+      with self._lock:
+          bump(self._generations, object)
+          with self._db:
+              self._db.execute("DELETE FROM response" +
+                               (" WHERE " + " AND ".join(where) if where else ""),
+                               args)
+
+  def stats(self):
+      """
+      Returns a dict with the hit, miss and revalidation
+      counters and the current number of entries
+      """
+      with self._lock:
+          size = self._db.execute("SELECT COUNT(*) FROM response").fetchone()[0]
+      return {'hits': self.hits,
+              'misses': self.misses,
+              'revalidated': self.revalidated,
+              'size': size}
+
+  def close(self):
+      """
+      Closes the underlying sqlite database
+      """
+      with self._lock:
+          self._db.close()
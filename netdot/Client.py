@@ -32,13 +32,73 @@ SUCH DAMAGES.
 import os
 import sys
 import re
+import time
+import random
+import threading
+import xml.etree.ElementTree as ET
+from io import BytesIO
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 import requests
-import Util
+from requests.adapters import HTTPAdapter
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3.util.retry import Retry
+from netdot import Util
+from netdot import Cache
+from netdot import SessionStore
+from netdot import Metrics
 
 __version__ = "1.0"
 
+# HTTP statuses worth retrying
+TRANSIENT_STATUS = (500, 502, 503, 504)
+
+# Small object classes that related lookups always fetch whole
+LOOKUP_TABLES = ('vlan', 'vlangroup')
+
+def not_found(error):
+    """
+    Tells whether an HTTPError is the 404 NetDot answers a
+    query matching no rows with
+    """
+    return error.response is not None and error.response.status_code == 404
+
+def page_overlap(page_size):
+    """
+    Returns the number of rows by which consecutive pages of an
+    iter_objects() walk overlap: a tenth of a page
+    """
+    return min(max(1, page_size // 10), page_size - 1)
+
+class JitterRetry(Retry):
+  """
+  urllib3 Retry policy whose exponential backoff is jittered,
+  so that concurrent clients don't retry in lock step.  Unlike
+  urllib3's default, which retries connection errors whatever
+  the method, requests of non-idempotent methods (POST) are
+  never retried: the bulk helpers that can safely repeat a
+  POST retry it themselves (see Connect._retry).
+  """
+  def get_backoff_time(self):
+      return random.uniform(0, super(JitterRetry, self).get_backoff_time())
+
+  def increment(self, method=None, url=None, *args, **kwargs):
+      if method is not None and not self._is_method_retryable(method):
+          # Exhausted: raises the error at once
+          return super(JitterRetry, self.new(total=0)).increment(
+              method, url, *args, **kwargs)
+      return super(JitterRetry, self).increment(method, url, *args, **kwargs)
+
 class Connect(object):
-  def __init__(self, username, password, server, verify = False, debug = 0):
+  def __init__(self, username, password, server, verify = False, debug = 0,
+               cache = None, disk_cache = None, timeout = 10, retries = 3,
+               backoff = 0.5, workers = 8, pool_connections = 10,
+               pool_maxsize = None, session_store = None, coalesce = False,
+               thread_sessions = False):
       """
       Class constructor, instantiates a number of
       variables for use in the class.  Mainly the required
@@ -51,25 +111,93 @@ class Connect(object):
                                     "https://netdot.localdomain/netdot",
                                     debug)
 
+      Passing a netdot.Cache.ResponseCache as cache enables
+      caching of GET responses; post() and delete() invalidate
+      the cached responses of the object type they write to.
+      A netdot.Cache.DiskCache passed as disk_cache keeps GET
+      responses on disk across runs, revalidating them with
+      conditional requests.
+
+      With coalesce set, concurrent get() and get_xml() calls for
+      the same url from several threads share a single request
+      (see netdot.Cache.SingleFlight).  The callers then receive
+      the same result object, which must not be modified.
+
+      With a netdot.SessionStore store passed as session_store,
+      the session cookies of a login are shared with every other
+      process using the same store: a stored session is reused
+      instead of logging in, and a new login is only made when
+      none is stored or the stored one has expired.
+
+      With thread_sessions set, the client may be shared by any
+      number of threads (e.g. the request handlers of a web
+      service): every thread sends its requests over a session of
+      its own, seeded with the cookies of the client's login, so
+      threads never share a requests.Session but still share one
+      login and the connection pools.  When the session expires,
+      one thread logs in again and the others pick up the new
+      cookies on their next request.
+
+      Transport arguments:
+        timeout -- Seconds to wait for the server, either one value
+                   or a (connect, read) tuple
+        retries -- Retries of connection errors and transient HTTP
+                   statuses.  Idempotent requests are retried by the
+                   transport; bulk updates retry their POSTs themselves.
+        backoff -- Backoff factor of the jittered exponential
+                   delay between retries
+        workers -- Default concurrency of the bulk helpers
+        pool_connections -- Number of host connection pools kept
+        pool_maxsize -- Connections kept per pool (defaults to the
+                        larger of pool_connections and workers)
+
       Returns: NetDot.client object.
       """
 
       self.debug = bool(debug)
       if self.debug:
-        print "DEBUG MODE: ON"
-      self.http = requests.session()
-      self.http.verify=verify
-
+        print("DEBUG MODE: ON")
       self.server = server
       self.base_url = server + '/rest'
       self.login_url = server + '/NetdotLogin'
-      self.timeout = 10
-      self.retries = 3
+      self.timeout = timeout
+      self.retries = retries
+      self.backoff = backoff
+      self.workers = workers
+      self.pool_connections = pool_connections
+      self.pool_maxsize = pool_maxsize or max(pool_connections, workers)
+
+      self.hooks = {'pre': [], 'post': [], 'parse': []}
+
+      self.http = requests.session()
+      self.http.verify=verify
+      adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                            pool_maxsize=self.pool_maxsize,
+                            max_retries=JitterRetry(
+                                total=retries,
+                                backoff_factor=backoff,
+                                status_forcelist=TRANSIENT_STATUS,
+                                raise_on_status=False))
+      self.http.mount('http://', adapter)
+      self.http.mount('https://', adapter)
+      self._adapter = adapter
+      self._local = threading.local() if thread_sessions else None
+      self.cache = cache
+      self.disk_cache = disk_cache
+      self.flights = Cache.SingleFlight() if coalesce else None
       self.version = __version__
       self.http.headers.update({ 'User_Agent':'Netdot::Client::REST/self.version',
                          'Accept':'text/xml; version=1.0'})
-      # Call the _login() function
-      self._login(username, password)
+      self.username = username
+      self._password = password
+      self._login_lock = threading.Lock()
+      self._login_generation = 0
+      self.session_store = session_store
+      if session_store is not None:
+        self._restore_session()
+      else:
+        # Call the _login() function
+        self._login(username, password)
 
   def _login(self, username, password):
       """
@@ -87,17 +215,177 @@ class Connect(object):
                   'credential_0':username,
                   'credential_1':password,
                   'permanent_session':1}
-      response = self.http.post(self.login_url, data=params)
+      response = self._request('POST', self.login_url, data=params)
       if response.status_code != 200:
         raise AttributeError('Invalid Credentials')
+      session = self._session()
+      if session is not self.http:
+        self.http.cookies.update(session.cookies)
+      self._login_generation += 1
+      if self.session_store is not None:
+        self.session_store.save(self._session_key(),
+                                SessionStore.dump_cookies(self.http.cookies))
+
+  def _session(self):
+      """
+      Internal Function. Returns the session requests are sent
+      over: self.http, or with thread_sessions the calling
+      thread's own session, (re)seeded with the cookies of
+      self.http whenever a login happened since it was last used.
+      """
+      if self._local is None:
+        return self.http
+      session = getattr(self._local, 'session', None)
+      if session is None:
+        session = self._local.session = requests.session()
+        session.verify = self.http.verify
+        session.headers.update(self.http.headers)
+        session.mount('http://', self._adapter)
+        session.mount('https://', self._adapter)
+        self._local.generation = None
+      generation = self._login_generation
+      if self._local.generation != generation:
+        session.cookies.clear()
+        session.cookies.update(self.http.cookies)
+        self._local.generation = generation
+      return session
+
+  def _session_key(self):
+      return self.server + ' ' + self.username
+
+  def _restore_session(self, stale=None):
+      """
+      Internal Function. Adopts the session cookies found in the
+      session store, unless there are none, they have expired, or
+      they are the stale ones just refused by the server; logs in
+      (and stores the new cookies) otherwise.
+      """
+      with self.session_store.lock():
+        cookies = self.session_store.load(self._session_key())
+        if cookies and cookies != stale and not SessionStore.expired(cookies):
+          SessionStore.load_cookies(self.http.cookies, cookies)
+          self._login_generation += 1
+        else:
+          self._login(self.username, self._password)
+
+  def _relogin(self, generation):
+      """
+      Internal Function. Logs in again after the session expired.
+      Only one thread logs in; threads whose request failed with
+      the same (expired) session wait for it and reuse the result.
+      With a session store, a session stored meanwhile by another
+      process is adopted instead.
+      """
+      with self._login_lock:
+        if self._login_generation == generation:
+          if self.session_store is not None:
+            self._restore_session(SessionStore.dump_cookies(self.http.cookies))
+          else:
+            self._login(self.username, self._password)
+
+  def _session_expired(self, response):
+      """
+      Internal Function. Tells whether a REST response was refused
+      because the session cookie expired: a 401/403, or a redirect
+      to the login page.
+      """
+      if response.status_code in (401, 403):
+        return True
+      for r in list(response.history) + [response]:
+        if 'NetdotLogin' in r.headers.get('Location', ''):
+          return True
+      return 'NetdotLogin' in response.url
+
+  def add_hook(self, hook, func):
+      """
+      Registers an instrumentation hook.  Hooks are called with a
+      dict describing the event:
+
+        'pre'   -- before each request: hook, method, url, template
+        'post'  -- after each request: the 'pre' keys plus status,
+                   bytes, network_time (seconds, including the body
+                   download unless streaming) and error
+        'parse' -- after each get() parse: hook, url, template,
+                   parse_time
+
+      url is relative to the REST base url; template is the url
+      with ids and query values replaced (see Metrics.url_template).
+      See netdot.Metrics.Metrics for ready made counters and
+      histograms.
+
+      Usage:
+        dot.add_hook('post', lambda event: log.info(event))
+      """
+      self.hooks[hook].append(func)
+
+  def _fire(self, hook, event):
+      event['hook'] = hook
+      for func in self.hooks[hook]:
+        func(event)
+
+  def _event(self, url):
+      if url.startswith(self.base_url):
+        url = url[len(self.base_url):]
+      return {'url': url, 'template': Metrics.url_template(url)}
+
+  def _request(self, method, url, **kwargs):
+      """
+      Internal Function. Sends a request over the shared session,
+      applying the configured timeout.  REST requests refused
+      because the session expired are replayed once after logging
+      in again.
+      """
+      kwargs.setdefault('timeout', self.timeout)
+      if not (self.hooks['pre'] or self.hooks['post']):
+        return self._send(method, url, **kwargs)
+
+      event = self._event(url)
+      event['method'] = method
+      self._fire('pre', dict(event))
+      event.update(status=None, bytes=None, error=None)
+      start = time.time()
+      try:
+        response = self._send(method, url, **kwargs)
+        event['status'] = response.status_code
+        if kwargs.get('stream'):
+          event['bytes'] = int(response.headers.get('Content-Length') or 0) or None
+        else:
+          event['bytes'] = len(response.content)
+        return response
+      except Exception as e:
+        event['error'] = e
+        raise
+      finally:
+        event['network_time'] = time.time() - start
+        self._fire('post', event)
+
+  def _send(self, method, url, **kwargs):
+      generation = self._login_generation
+      response = self._session().request(method, url, **kwargs)
+      if url.startswith(self.base_url) and self._session_expired(response):
+        response.close()
+        self._relogin(generation)
+        response = self._session().request(method, url, **kwargs)
+      return response
 
   def logout(self):
       """
       Logout of the NetDot API
       """
-      response = self.http.post(self.server + '/logout.html')
+      response = self._request('POST', self.server + '/logout.html')
+
+  def _invalidate(self, url):
+      """
+      Internal Function. Drops cached responses made stale by a
+      write to url.
+      """
+      object = Cache.object_type(url)
+      if self.cache is not None:
+        self.cache.invalidate(object, server=self.base_url)
+      if self.disk_cache is not None:
+        self.disk_cache.invalidate(object, server=self.base_url)
 
-  def get_xml(self, url):
+  def get_xml(self, url, stream=False):
       """
       This function provides a simple interface
       into the "GET" function by handling the authentication
@@ -106,6 +394,8 @@ class Connect(object):
 
       Arguments:
         url -- Url to append to the base url
+        stream -- If True, the body is not read; a file-like
+                  object for the response body is returned instead
 
       Usage:
         response = netdot.Client.get_xml("/url")
@@ -113,27 +403,189 @@ class Connect(object):
       Returns:
         XML string output from Netdot
       """
-      response = self.http.get(self.base_url + url)
+      if self.flights is not None and not stream:
+        return self.flights.do(('xml', url), self._get_xml, url)
+      return self._get_xml(url, stream)
+
+  def _get_xml(self, url, stream=False):
+      if self.cache is not None and not stream:
+        content = self.cache.get(url, self.base_url, self.username)
+        if content is not None:
+          return content
+        # A write while fetching makes the response unfit to cache
+        generation = self.cache.generation(url)
+      headers = {}
+      entry = None
+      if self.disk_cache is not None and not stream:
+        disk_generation = self.disk_cache.generation(url)
+        entry = self.disk_cache.get(url, self.base_url, self.username)
+        if entry is not None:
+          if entry.fresh:
+            return entry.content
+          headers = self.disk_cache.conditional_headers(entry)
+      response = self._request('GET', self.base_url + url, stream=stream,
+                               headers=headers)
       if self.debug:
         Util.dump(response)
-      response.raise_for_status()
-      return response.content
-
-  def get(self, url):
+      if entry is not None and response.status_code == 304:
+        self.disk_cache.touch(url, self.base_url, self.username)
+        content = entry.content
+      else:
+        response.raise_for_status()
+        if stream:
+          response.raw.decode_content = True
+          return response.raw
+        content = response.content
+        if self.disk_cache is not None:
+          self.disk_cache.set(url, content,
+                              response.headers.get('ETag'),
+                              response.headers.get('Last-Modified'),
+                              self.base_url, self.username, disk_generation)
+      if self.cache is not None:
+        self.cache.set(url, content, self.base_url, self.username, generation)
+      return content
+
+  def get(self, url, stream=False, compact=False, fields=None):
       """
       This function delegates to get_xml() and parses the
       response xml to return a dict
 
       Arguments:
         url -- Url to append to the base url
+        stream -- If True, the response is parsed incrementally
+                  while it is downloaded and a generator of
+                  (tag, id, attrib) tuples is returned instead.
+                  Use this for large list queries.
+        compact -- If True, list results are returned as
+                   memory efficient Util.Table/Util.Record
+                   objects (see Util.parse_xml)
+        fields -- Optional list of field patterns; only matching
+                  fields are kept (see Util.filter_dict), and the
+                  others are dropped while parsing
 
       Usage:
         dict = netdot.Client.get("/url")
+        for tag, id, attrib in netdot.Client.get("/interface", stream=True):
+          ...
 
       Returns:
-        Result as a multi-level dictionary on success.
+        Result as a multi-level dictionary on success, or a
+        generator when stream is True.
       """
-      return Util.parse_xml(self.get_xml(url))
+      if stream:
+        return Util.iter_xml(self.get_xml(url, stream=True))
+      if self.flights is not None:
+        key = ('get', url, compact, tuple(fields or ()))
+        return self.flights.do(key, self._get, url, compact, fields)
+      return self._get(url, compact, fields)
+
+  def _get(self, url, compact, fields):
+      xml = self.get_xml(url)
+      if not self.hooks['parse']:
+        return Util.parse_xml(xml, compact=compact, fields=fields)
+      start = time.time()
+      data = Util.parse_xml(xml, compact=compact, fields=fields)
+      event = self._event(url)
+      event['parse_time'] = time.time() - start
+      self._fire('parse', event)
+      return data
+
+  def iter_objects(self, object, page_size=1000, prefetch=True, **filters):
+      """
+      Walks every row of an object class in pages of page_size
+      rows, yielding them one at a time.  Pages are requested with
+      'limit' and 'offset' query parameters; while the caller
+      consumes one page the next is downloaded in the background
+      unless prefetch is False.  If the server ignores the paging
+      parameters the whole table comes back in the first page,
+      which is then yielded and the walk ends.  No rows (a 404
+      from NetDot) end the walk.
+
+      Consecutive pages overlap by a tenth of a page, and each
+      page resumes after the last row of the previous one found
+      in it, so rows inserted or deleted during the walk shift
+      the pages without rows being skipped or yielded twice.  If
+      no row of the previous page is found, more rows than the
+      overlap were deleted and the walk steps back a page.  This
+      relies on the server returning rows in a stable order,
+      such as by id.
+
+      Arguments:
+        object -- 'device', 'interface', 'rr', etc...
+        page_size -- Number of rows requested per page
+        prefetch -- Fetch the next page while the current one is consumed
+        filters -- Optional field=value filters applied to every page
+
+      Usage:
+        for tag, id, attrib in netdot.Client.iter_objects('interface', page_size=5000):
+          ...
+
+      Returns:
+        Generator of (tag, id, attrib) tuples
+      """
+      def fetch(offset):
+          params = dict(filters, limit=page_size, offset=offset)
+          try:
+              content = self.get_xml(Util.query_url(object, params))
+          except requests.exceptions.HTTPError as e:
+              if not_found(e):
+                  return []
+              raise
+          return list(Util.iter_xml(BytesIO(content)))
+
+      overlap = page_overlap(page_size)
+      pool = None
+      if prefetch:
+          # Imported on first use, it is slow to import
+          from multiprocessing.pool import ThreadPool
+          pool = ThreadPool(1)
+      try:
+          offset = 0
+          rows = fetch(offset)
+          previous = set()
+          first_id = None
+          stepped = False
+          while rows:
+              if len(rows) > page_size:
+                  # Paging is not supported; this is the whole table
+                  for tag, id, attrib in rows:
+                      yield tag, id, attrib
+                  return
+              start = 0
+              if previous and not stepped:
+                  if rows[0][1] == first_id:
+                      # Same page again, paging is not supported
+                      return
+              if previous and overlap:
+                  start = None
+                  for position in range(len(rows) - 1, -1, -1):
+                      if rows[position][1] in previous:
+                          start = position + 1
+                          break
+                  if start is None and offset > 0:
+                      # The rows before this page shifted past the
+                      # overlap; step back
+                      offset = max(0, offset - (page_size - overlap))
+                      rows = fetch(offset)
+                      stepped = True
+                      continue
+              stepped = False
+              last = len(rows) < page_size
+              if pool and not last:
+                  pending = pool.apply_async(fetch, (offset + len(rows) - overlap,))
+              for tag, id, attrib in rows[start or 0:]:
+                  if id not in previous:
+                      yield tag, id, attrib
+              if last:
+                  return
+              first_id = rows[0][1]
+              previous = set(id for tag, id, attrib in rows)
+              offset += len(rows) - overlap
+              rows = pending.get() if pool else fetch(offset)
+      finally:
+          if pool:
+              pool.close()
+              pool.join()
 
   def post(self, url, data):
       """
@@ -152,7 +604,8 @@ class Connect(object):
       Returns:
         Result as a multi-level dictionary on success
       """
-      response = self.http.post(self.base_url + url, data=data)
+      response = self._request('POST', self.base_url + url, data=data)
+      self._invalidate(url)
       if self.debug:
         Util.dump(response)
       response.raise_for_status()
@@ -176,7 +629,8 @@ class Connect(object):
       Returns:
         Result as an empty multi-level dictionary
       """
-      response = self.http.delete(self.base_url + url)
+      response = self._request('DELETE', self.base_url + url)
+      self._invalidate(url)
       if self.debug:
         Util.dump(response)
       response.raise_for_status()
@@ -196,7 +650,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success.
       """
-      return self.get("/host?ipid=" + id)
+      return self.get(Util.query_url('host', {'ipid': id}))
 
   def get_host_by_rrid(self, id):
       """
@@ -212,7 +666,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success.
       """
-      return self.get("/host?rrid=" + id)
+      return self.get(Util.query_url('host', {'rrid': id}))
 
   def get_host_by_name(self, name):
       """
@@ -227,7 +681,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success.
       """
-      return self.get("/host?name=" + name)
+      return self.get(Util.query_url('host', {'name': name}))
 
   def get_ipblock(self, ipblock):
       """
@@ -243,7 +697,7 @@ class Connect(object):
       Returns:
         Array of NetDot-XML objects on success
       """
-      return self.get("/host?subnet=" + ipblock)
+      return self.get(Util.query_url('host', {'subnet': ipblock}))
 
   def get_host_address(self, address):
       """
@@ -259,7 +713,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success.
       """
-      return self.get("/host?address=" + address)
+      return self.get(Util.query_url('host', {'address': address}))
 
   def get_person_by_username(self, user):
       """
@@ -274,7 +728,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success.
       """
-      return self.get("/person?username=" + user)
+      return self.get(Util.query_url('person', {'username': user}))
 
   def get_person_by_id(self, id):
       """
@@ -289,7 +743,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success.
       """
-      xml = self.get_xml("/person?id=" + id)
+      xml = self.get_xml(Util.query_url('person', {'id': id}))
       xml_root = ET.fromstring(xml)
       person = dict()
 
@@ -348,7 +802,45 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      return self.get("/" + object + "?id=" + id)
+      return self.query(object, {'id': id})
+
+  def get_many(self, object, ids, workers=None):
+      """
+      Fetches many objects of the same type by id.  The ids are
+      fetched concurrently, one request each, and the results are
+      merged into a single multi-level dictionary.  A failed
+      lookup does not abort the batch; it is reported in the
+      returned errors dictionary instead.
+
+      Arguments:
+        object -- 'device', 'person',  etc...
+        ids -- Iterable of object IDs
+        workers -- Maximum number of concurrent requests
+                   (defaults to self.workers)
+
+      Usage:
+        data, errors = netdot.Client.get_many("device", ["1", "2", "3"])
+
+      Returns:
+        Tuple of (multi-level dictionary, {id: exception})
+      """
+      if workers is None:
+          workers = self.workers
+
+      def get_one(id):
+          try:
+              return id, self.get_object_by_id(object, str(id)), None
+          except (requests.exceptions.RequestException, Util.NetdotError) as e:
+              return id, None, e
+
+      data = {}
+      errors = {}
+      for id, result, error in Util.concurrent_map(get_one, ids, workers):
+          if error is None:
+              Util.merge_data(data, result)
+          else:
+              errors[id] = error
+      return data, errors
 
   def get_object_by_name(self, object, name):
       """
@@ -364,7 +856,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      return self.get("/" + object + "?name=" + name)
+      return self.query(object, {'name': name})
 
   def get_object_by_desc(self, object, desc):
       """
@@ -381,7 +873,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      return self.get("/" + object + "?description=" + desc)
+      return self.query(object, {'description': desc})
 
   def get_object_by_info(self, object, info):
       """
@@ -398,7 +890,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      return self.get("/" + object + "?info=" + info)
+      return self.query(object, {'info': info})
 
   def delete_object_by_id(self, object, id):
       """
@@ -415,6 +907,118 @@ class Connect(object):
       """
       return self.delete("/" + object + "/" + id)
 
+  def _object_url(self, object, id):
+      """
+      Internal Function. Returns the url of a single object,
+      hosts being addressed by RR ID.
+      """
+      if object == 'host':
+          return Util.query_url('host', {'rrid': id})
+      return "/" + object + "/" + str(id)
+
+  def _retry(self, func, *args):
+      """
+      Internal Function. Calls func, retrying up to self.retries
+      times with jittered exponential backoff when it fails with
+      a connection error, a timeout or a transient HTTP status.
+      Only for POSTs that are safe to repeat, such as updates;
+      the transport does not retry POST (see JitterRetry), so
+      this is the only retry layer.
+      """
+      attempt = 0
+      while True:
+          try:
+              return func(*args)
+          except (requests.exceptions.ConnectionError,
+                  requests.exceptions.Timeout,
+                  requests.exceptions.HTTPError) as e:
+              if isinstance(e, requests.exceptions.HTTPError) and \
+                      e.response is not None and \
+                      e.response.status_code not in TRANSIENT_STATUS:
+                  raise
+              if attempt >= self.retries:
+                  raise
+              time.sleep(Util.backoff(attempt, self.backoff))
+              attempt += 1
+
+  def _run_many(self, method, calls, workers, dry_run):
+      """
+      Internal Function. Runs {id: (url, data)} calls of method
+      concurrently and collects per-id outcomes.
+      """
+      if workers is None:
+          workers = self.workers
+      if dry_run:
+          return dict((id, (method, url, data))
+                      for id, (url, data) in calls.items()), {}
+
+      def call(item):
+          id, (url, data) = item
+          try:
+              if method == 'DELETE':
+                  # DELETE is idempotent, the transport retries it
+                  return id, self.delete(url), None
+              return id, self._retry(self.post, url, data), None
+          except (requests.exceptions.RequestException, Util.NetdotError) as e:
+              return id, None, e
+
+      results = {}
+      errors = {}
+      for id, result, error in Util.concurrent_map(call, calls.items(), workers):
+          if error is None:
+              results[id] = result
+          else:
+              errors[id] = error
+      return results, errors
+
+  def delete_many(self, object, ids, workers=None, dry_run=False):
+      """
+      Deletes many objects of the same type concurrently, retrying
+      transient failures.  A failure does not abort the batch; it
+      is reported in the returned errors dictionary instead.
+
+      Arguments:
+        object -- 'device', 'vlan', etc..., or 'host' for RR IDs
+        ids -- Iterable of object IDs
+        workers -- Maximum number of concurrent requests
+                   (defaults to self.workers)
+        dry_run -- If True nothing is sent; the results hold the
+                   (method, url, data) that would have been sent
+
+      Usage:
+        results, errors = netdot.Client.delete_many("host", ["1111", "1112"])
+
+      Returns:
+        Tuple of ({id: response}, {id: exception})
+      """
+      calls = dict((id, (self._object_url(object, id), None)) for id in ids)
+      return self._run_many('DELETE', calls, workers, dry_run)
+
+  def update_many(self, object, updates, workers=None, dry_run=False):
+      """
+      Updates many objects of the same type concurrently, retrying
+      transient failures.  A failure does not abort the batch; it
+      is reported in the returned errors dictionary instead.
+
+      Arguments:
+        object -- 'device', 'vlan', etc..., or 'host' for RR IDs
+        updates -- dict of object ID to dict of fields to update
+        workers -- Maximum number of concurrent requests
+                   (defaults to self.workers)
+        dry_run -- If True nothing is sent; the results hold the
+                   (method, url, data) that would have been sent
+
+      Usage:
+        results, errors = netdot.Client.update_many("device",
+                                                    {"12": {'info': 'spare'}})
+
+      Returns:
+        Tuple of ({id: response}, {id: exception})
+      """
+      calls = dict((id, (self._object_url(object, id), data))
+                   for id, data in updates.items())
+      return self._run_many('POST', calls, workers, dry_run)
+
   def get_contact_by_person_id(self, id):
       """
       Returns contact information for given person ID
@@ -428,7 +1032,7 @@ class Connect(object):
       Returns:
         Single-level dictionary on success
       """
-      xml = self.get_xml("/contact?person=" + id)
+      xml = self.get_xml(Util.query_url('contact', {'person': id}))
       xml_root = ET.fromstring(xml)
       person = dict()
 
@@ -466,7 +1070,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      return self.get("/groupright?contactlist=" + id)
+      return self.get(Util.query_url('groupright', {'contactlist': id}))
 
   def add_cname_to_record(self, name, cname):
       """
@@ -482,10 +1086,10 @@ class Connect(object):
       """
       data = { 'cname': cname }
       host = self.get_host_by_name(name)
-      for key in host[name]['RR'].iterkeys():
-        for attr, attr_val in host[name]['RR'][key].iteritems():
+      for key in host[name]['RR'].keys():
+        for attr, attr_val in host[name]['RR'][key].items():
           if attr == 'name' and attr_val == name:
-            return self.post("/host?rrid=" + host['RR'][key]['id'], data)
+            return self.post(Util.query_url('host', {'rrid': host['RR'][key]['id']}), data)
 
   def rename_host(self, old, new):
       """
@@ -506,7 +1110,7 @@ class Connect(object):
       rrid = host['RR']['id']
       data = {}
       data['name'] = new
-      return self.post("/host?rrid=" + rrid, data)
+      return self.post(Util.query_url('host', {'rrid': rrid}), data)
 
   def create_host(self, data):
       """
@@ -536,6 +1140,91 @@ class Connect(object):
       """
       return self.post("/host", data)
 
+  def create_hosts(self, hosts, workers=None, stop_on_error=False):
+      """
+      Creates many hosts concurrently (see create_host()).
+      Hosts asking for the next available address of a subnet
+      (subnet given, no address) are created one after the other
+      within that subnet, so they don't race for the same address;
+      different subnets, and hosts with explicit addresses, are
+      created in parallel.  Outcomes are yielded as they complete.
+
+      Arguments:
+        hosts -- Iterable of create_host() data dicts
+        workers -- Maximum number of concurrent requests
+                   (defaults to self.workers)
+        stop_on_error -- Stop creating hosts after the first failure
+
+      Usage:
+        for data, result, error in netdot.Client.create_hosts(hosts):
+          if error:
+            ...
+
+      Returns:
+        Generator of (data, result, error) tuples, where result is
+        the create_host() response and error the exception raised,
+        one of them being None.
+      """
+      if workers is None:
+          workers = self.workers
+
+      # One task per subnet for 'next available' hosts, one per
+      # host otherwise
+      tasks = []
+      subnets = {}
+      for data in hosts:
+          subnet = data.get('subnet')
+          if subnet and not data.get('address'):
+              if subnet not in subnets:
+                  subnets[subnet] = []
+                  tasks.append(subnets[subnet])
+              subnets[subnet].append(data)
+          else:
+              tasks.append([data])
+      if not tasks:
+          return
+
+      todo = queue.Queue()
+      for task in tasks:
+          todo.put(task)
+      done = queue.Queue()
+      stop = threading.Event()
+
+      def worker():
+          try:
+              while not stop.is_set():
+                  try:
+                      task = todo.get_nowait()
+                  except queue.Empty:
+                      break
+                  for data in task:
+                      if stop.is_set():
+                          break
+                      try:
+                          done.put((data, self.create_host(data), None))
+                      except (requests.exceptions.RequestException, Util.NetdotError) as e:
+                          done.put((data, None, e))
+                          if stop_on_error:
+                              stop.set()
+          finally:
+              done.put(None)
+
+      threads = [threading.Thread(target=worker)
+                 for i in range(min(workers, len(tasks)))]
+      for thread in threads:
+          thread.daemon = True
+          thread.start()
+      try:
+          running = len(threads)
+          while running:
+              outcome = done.get()
+              if outcome is None:
+                  running -= 1
+              else:
+                  yield outcome
+      finally:
+          stop.set()
+
   def delete_host_by_rrid(self, id):
       """
       This function deletes a hostname record
@@ -549,7 +1238,7 @@ class Connect(object):
 
       Returns:
       """
-      return self.delete("/host?rrid=" + id)
+      return self.delete(Util.query_url('host', {'rrid': id}))
 
   def delete_host_by_ipid(self, id):
       """
@@ -564,7 +1253,7 @@ class Connect(object):
 
       Returns:
       """
-      return self.delete("/host?ipid=" + id)
+      return self.delete(Util.query_url('host', {'ipid': id}))
 
   def get_vlans_by_groupid(self, id):
       """
@@ -579,7 +1268,7 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      return self.get("/vlan?VlanGroup=" + id)
+      return self.get(Util.query_url('vlan', {'VlanGroup': id}))
 
   def get_object_by_filter(self, object, field, value):
       """
@@ -596,15 +1285,46 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      url = "/{}?{}={}".format(object, field, value)
-      return self.get(url)
+      return self.query(object, {field: value})
+
+  def query(self, object, filters=None, fields=None, compact=False, **kwargs):
+      """
+      Returns the objects matching every given filter, fetched
+      with a single encoded request (see Util.query_url), so the
+      server narrows the result instead of the caller.  Field
+      selection is not part of the REST interface; the fields
+      given are selected while the response is parsed.
+
+      Arguments:
+        object -- 'device', 'interface', 'rr', etc...
+        filters -- Dictionary of field => value
+        fields -- Optional list of field patterns to keep
+                  (see Connect.get)
+        compact -- Return Util.Table/Util.Record objects
+        kwargs -- More field=value filters
+
+      Usage:
+        response = netdot.Client.query('interface', device=12,
+                                       oper_status='up',
+                                       fields=['name', 'speed'])
+
+      Returns:
+        Multi-level dictionary on success
+      """
+      filters = dict(filters or {}, **kwargs)
+      return self.get(Util.query_url(object, filters), compact=compact,
+                      fields=fields)
 
-  def get_device_vlans(self, device):
+  def get_device_vlans(self, device, workers=None):
       """
       Returns a multi-level dict of vlans that exist on the supplied device.
+      The per-interface lookups are run concurrently over the shared
+      session.
 
       Arguments:
-        device == NetDot Device ID
+        device -- NetDot Device ID
+        workers -- Maximum number of concurrent lookups
+                   (defaults to self.workers)
 
       Usage:
         response = netdot.Client.get_device_vlans(device)
@@ -612,28 +1332,177 @@ class Connect(object):
       Returns:
         Multi-level dictionary on success
       """
-      # empty list to hold our results
-      dev_vlans = []
+      if workers is None:
+          workers = self.workers
 
       # get the interfaces associated with a device
       dev_ifaces = self.get_object_by_filter('interface', 'device', device)
 
-      # interate through each interface and cross reference against the interfacevlan table
-      for iface in dev_ifaces['Interface'].keys():
+      def get_iface_vlans(iface):
           try:
-            iface_vlans = self.get_object_by_filter('interfacevlan', 'interface', iface)
-            for iv in iface_vlans['InterfaceVlan'].keys():
-                print iv
-                if iface_vlans['InterfaceVlan'][iv]['vlan'] not in dev_vlans:
-                    dev_vlans.append(iface_vlans['InterfaceVlan'][iv]['vlan'])
+              return self.get_object_by_filter('interfacevlan', 'interface', iface)
           except requests.exceptions.HTTPError as e:
               # This is caused by SVI interfaces.  They don't have a Vlan
               # because they are Vlans...
-              pass
+              return {}
+
+      # cross reference each interface against the interfacevlan table
+      dev_vlans = []
+      for iface_vlans in Util.concurrent_map(get_iface_vlans,
+                                             dev_ifaces['Interface'].keys(),
+                                             workers):
+          for iv in iface_vlans.get('InterfaceVlan', {}).values():
+              if iv['vlan'] not in dev_vlans:
+                  dev_vlans.append(iv['vlan'])
 
       return {"Device": {
                 device : dev_vlans
                 }
               }
 
+  def _related(self, object, field, keys, workers, page_size):
+      """
+      Internal Function. Returns {key: {id: attrib}} for the rows
+      of object whose field refers to one of keys, using whichever
+      takes fewer requests: one query per key (concurrently), or a
+      walk of the table in pages of page_size rows, matched
+      locally.  The object classes in LOOKUP_TABLES are always
+      fetched whole with one GET.  Otherwise a one row probe tells
+      whether the table has more rows than a walk of len(keys)
+      pages covers.  One or two keys are always queried directly,
+      as the probe alone would cost as much.
+      """
+      keys = set(str(key) for key in keys)
+      rows = {}
+      if not keys:
+          return rows
+
+      table = None
+      if object in LOOKUP_TABLES:
+          table = self._rows(Util.query_url(object))
+      elif len(keys) > 2:
+          # With no row at this offset, the walk's last (short or
+          # empty) page starts at or before it: len(keys) pages
+          step = page_size - page_overlap(page_size)
+          offset = (len(keys) - 1) * step
+          probe = self._rows(Util.query_url(object, {'limit': 1, 'offset': offset}))
+          if not probe:
+              table = ((id, attrib) for tag, id, attrib in
+                       self.iter_objects(object, page_size=page_size))
+          elif len(probe) > 1:
+              # Paging is not supported; this is the whole table
+              table = probe
+      if table is not None:
+          for id, attrib in table:
+              for key in Util.index_keys(attrib, field):
+                  if key in keys:
+                      rows.setdefault(key, {})[id] = attrib
+                      break
+          return rows
+
+      def fetch(key):
+          return key, self._rows(Util.query_url(object, {field: key}))
+
+      for key, matches in Util.concurrent_map(fetch, keys, workers):
+          if matches:
+              rows[key] = dict(matches)
+      return rows
+
+  def _rows(self, url):
+      """
+      Internal Function. Returns the (id, attrib) pairs of a list
+      query, or none when NetDot answers 404 (no matching rows).
+      """
+      try:
+          data = self.get(url)
+      except requests.exceptions.HTTPError as e:
+          if not_found(e):
+              return []
+          raise
+      rows = []
+      for tag, objects in data.items():
+          if isinstance(objects, dict):
+              rows.extend(objects.items())
+      return rows
+
+  def get_device_bundle(self, devices, include=('interfaces', 'vlans', 'ips'),
+                        workers=None, page_size=1000):
+      """
+      Fetches one or more devices together with their interfaces,
+      VLANs and IP addresses, joining the tables client-side by
+      foreign key.  Each related table is fetched once for all the
+      devices.  VLANs (see LOOKUP_TABLES) come with one GET of the
+      whole table.  Interface, InterfaceVlan and Ipblock rows are
+      found with one filtered query per key, or with a paged walk
+      of the table (see iter_objects()) when that takes fewer
+      requests, so a table costs at most about len(keys) requests
+      and at most its number of pages.
+
+      Arguments:
+        devices -- NetDot Device ID, or list of IDs
+        include -- Any of 'interfaces', 'vlans' and 'ips'
+                   ('vlans' and 'ips' imply 'interfaces')
+        workers -- Maximum number of concurrent queries
+                   (defaults to self.workers)
+        page_size -- Rows requested per page when a table is walked
 
+      Usage:
+        bundle = netdot.Client.get_device_bundle('12', include=['vlans'])
+
+      Returns:
+        Multi-level dictionary:
+          {'Device': {device: {'interfaces': {interface id: {'attrib': {...},
+                                                            'vlans': {vlan id: {...}},
+                                                            'ips': {ipblock id: {...}}}},
+                               'vlans': {vlan id: {...}}}}}
+      """
+      if workers is None:
+          workers = self.workers
+      if isinstance(devices, (list, tuple, set)):
+          devices = [str(device) for device in devices]
+      else:
+          devices = [str(devices)]
+      include = set(include)
+
+      bundle = {}
+      for device in devices:
+          bundle[device] = {'interfaces': {}}
+          if 'vlans' in include:
+              bundle[device]['vlans'] = {}
+      if not include & set(('interfaces', 'vlans', 'ips')):
+          return {"Device": bundle}
+
+      interfaces = {}
+      by_device = self._related('interface', 'device', devices, workers, page_size)
+      for device, rows in by_device.items():
+          for id, attrib in rows.items():
+              interfaces[id] = device
+              entry = {'attrib': attrib}
+              if 'vlans' in include:
+                  entry['vlans'] = {}
+              if 'ips' in include:
+                  entry['ips'] = {}
+              bundle[device]['interfaces'][id] = entry
+
+      if 'vlans' in include and interfaces:
+          iface_vlans = self._related('interfacevlan', 'interface', interfaces,
+                                      workers, page_size)
+          links = []
+          for iface, rows in iface_vlans.items():
+              for attrib in rows.values():
+                  for vlan in Util.index_keys(attrib, 'vlan')[-1:]:
+                      links.append((iface, vlan))
+          vlans = self._related('vlan', 'id', set(vlan for iface, vlan in links),
+                                workers, page_size)
+          for iface, vlan in links:
+              device = interfaces[iface]
+              attrib = vlans.get(vlan, {}).get(vlan, {})
+              bundle[device]['interfaces'][iface]['vlans'][vlan] = attrib
+              bundle[device]['vlans'][vlan] = attrib
+
+      if 'ips' in include and interfaces:
+          ips = self._related('ipblock', 'interface', interfaces, workers, page_size)
+          for iface, rows in ips.items():
+              bundle[interfaces[iface]]['interfaces'][iface]['ips'].update(rows)
+
+      return {"Device": bundle}
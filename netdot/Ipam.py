@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Ipam.py
+
+In-memory IP address management queries over NetDot Ipblocks.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import time
+import bisect
+import threading
+from netdot import Util
+from netdot import Prefix
+
+class Ipam(object):
+  def __init__(self, dot=None, page_size=10000):
+      """
+      Loads every Ipblock once and answers longest-prefix-match,
+      utilization and next-free queries in bulk from memory,
+      instead of one get_ipblock()/get_host_address() call per
+      subnet or address.  Blocks are kept in a Prefix.PrefixIndex
+      and, for each block, a sorted list of its direct children
+      (the blocks it is the longest match of), which is what
+      utilization and free space are computed from.
+
+      Arguments:
+        dot -- netdot.Client.Connect object used by refresh()
+        page_size -- Rows requested per page while loading
+
+      Usage:
+        ipam = netdot.Ipam.Ipam(dot)
+        ipam.refresh()
+        ipam.lookup(['10.1.2.3', '10.1.9.9'])
+        ipam.utilization('10.1.0.0/16', prefixlen=24)
+        ipam.next_free('10.1.2.0/24', count=4)
+
+      Returns: netdot.Ipam.Ipam object.
+      """
+      self.dot = dot
+      self.page_size = page_size
+      self.blocks = Util.Table()
+      self.prefixes = Prefix.PrefixIndex()
+      self.children = {}
+      self.loaded = None
+      self._lock = threading.Lock()
+
+  def refresh(self):
+      """
+      Reloads every Ipblock from the server
+      """
+      self.load(attrib for tag, id, attrib in
+                self.dot.iter_objects('ipblock', page_size=self.page_size))
+
+  def load(self, rows):
+      """
+      Builds the indexes from Ipblock attribute dicts, e.g. the
+      rows of an already loaded Snapshot:
+
+        ipam.load(snap.tables['Ipblock'].values())
+
+      The new indexes are built aside and swapped in at the end,
+      so queries keep working during a reload.
+      """
+      blocks = Util.Table()
+      prefixes = Prefix.PrefixIndex()
+      parsed = []
+      for attrib in rows:
+          if not attrib.get('address') or not attrib.get('prefix'):
+              continue
+          version, value = Prefix.parse_address(attrib['address'],
+                                                attrib.get('version'))
+          prefixlen = int(attrib['prefix'])
+          net = Prefix.network(version, value, prefixlen)
+          blocks.add(attrib)
+          prefixes.add(net, prefixlen, attrib['id'], version)
+          parsed.append((version, net, prefixlen, attrib['id']))
+
+      # Direct children of every block; top level blocks are
+      # filed under the IP version
+      children = {}
+      for version, net, prefixlen, id in parsed:
+          parent = version
+          for other, length, other_id in prefixes.match(version, net):
+              if length < prefixlen:
+                  parent = other_id
+                  break
+          children.setdefault(parent, []).append((net, prefixlen, id))
+      for parent, entries in children.items():
+          entries.sort()
+          children[parent] = ([net for net, prefixlen, id in entries], entries)
+
+      with self._lock:
+          self.blocks = blocks
+          self.prefixes = prefixes
+          self.children = children
+          self.loaded = time.time()
+
+  def _owner(self, version, net, prefixlen):
+      # Longest block containing (or equal to) the range, or
+      # the IP version for ranges outside every block
+      for other, length, id in self.prefixes.match(version, net):
+          if length <= prefixlen:
+              return id
+      return version
+
+  def _inside(self, version, net, prefixlen):
+      # The largest blocks strictly inside the range, in order.
+      # They are direct children of the range's owner, since
+      # any block in between would be the owner itself.
+      nets, entries = self.children.get(self._owner(version, net, prefixlen),
+                                        ((), ()))
+      end = net + (1 << (Prefix.WIDTH[version] - prefixlen))
+      start = bisect.bisect_left(nets, net)
+      for position in range(start, bisect.bisect_left(nets, end)):
+          if entries[position][1] > prefixlen:
+              yield entries[position]
+
+  def _ranges(self, cidr, prefixlen):
+      version, net, length = Prefix.parse_prefix(cidr)
+      if prefixlen is None or int(prefixlen) <= length:
+          return version, [(net, length)]
+      prefixlen = int(prefixlen)
+      step = 1 << (Prefix.WIDTH[version] - prefixlen)
+      count = 1 << (prefixlen - length)
+      return version, [(net + n * step, prefixlen) for n in range(count)]
+
+  def cidr(self, id):
+      """
+      Returns the prefix of a block in CIDR notation
+      """
+      record = self.blocks[str(id)]
+      version, net, prefixlen = Prefix.parse_prefix(
+          '%s/%s' % (record['address'], record['prefix']))
+      return '%s/%d' % (Prefix.format_address(version, net), prefixlen)
+
+  def block(self, cidr):
+      """
+      Returns the Ipblock record of exactly this prefix, or None
+      """
+      version, net, prefixlen = Prefix.parse_prefix(cidr)
+      id = self.prefixes.get(net, prefixlen, version)
+      return None if id is None else self.blocks[id]
+
+  def lookup(self, addresses, hosts=False):
+      """
+      Finds the most specific block containing each address
+
+      Arguments:
+        addresses -- Address, or list of addresses
+        hosts -- If True, an address recorded as a host block
+                 (/32 or /128) matches itself; by default the
+                 subnet or container it is in is returned
+
+      Usage:
+        blocks = ipam.lookup(['10.1.2.3', '2001:db8::1'])
+
+      Returns:
+        Dictionary of address => Ipblock record (None when
+        no block contains the address)
+      """
+      if not isinstance(addresses, (list, tuple, set)):
+          addresses = [addresses]
+      result = {}
+      for address in addresses:
+          version, value = Prefix.parse_address(address)
+          result[address] = None
+          for net, prefixlen, id in self.prefixes.match(version, value):
+              if hosts or prefixlen < Prefix.WIDTH[version]:
+                  result[address] = self.blocks[id]
+                  break
+      return result
+
+  def utilization(self, cidrs, prefixlen=None):
+      """
+      Address usage of blocks.  Used addresses are those covered
+      by the blocks directly inside a range: host addresses in a
+      subnet, subnets in a container.  Ranges need not be blocks
+      themselves.
+
+      Arguments:
+        cidrs -- Prefix, or list of prefixes, in CIDR notation
+        prefixlen -- Optionally split each prefix into all of its
+                     sub-prefixes of this length and report those
+
+      Usage:
+        usage = ipam.utilization('10.1.0.0/16', prefixlen=24)
+        usage['10.1.7.0/24']['free']
+
+      Returns:
+        Dictionary of CIDR => {'total', 'used', 'free', 'utilization'}
+      """
+      if not isinstance(cidrs, (list, tuple, set)):
+          cidrs = [cidrs]
+      result = {}
+      for cidr in cidrs:
+          version, ranges = self._ranges(cidr, prefixlen)
+          width = Prefix.WIDTH[version]
+          for net, length in ranges:
+              total = 1 << (width - length)
+              used = sum(1 << (width - inner)
+                         for other, inner, id in self._inside(version, net, length))
+              key = '%s/%d' % (Prefix.format_address(version, net), length)
+              result[key] = {'total': total, 'used': used, 'free': total - used,
+                             'utilization': used / float(total)}
+      return result
+
+  def next_free(self, cidr, count=1, prefixlen=None):
+      """
+      Finds free space inside a block: addresses, or aligned
+      prefixes of a given length, not covered by any block in it.
+      The network and broadcast addresses of IPv4 subnets are
+      never returned.
+
+      Arguments:
+        cidr -- Prefix in CIDR notation
+        count -- Maximum number of results
+        prefixlen -- Length of the free prefixes wanted (defaults
+                     to single addresses)
+
+      Usage:
+        ipam.next_free('10.1.2.0/24', count=4)
+        ipam.next_free('10.1.0.0/16', prefixlen=24)
+
+      Returns:
+        List of addresses (or prefixes in CIDR notation), lowest first
+      """
+      version, net, length = Prefix.parse_prefix(cidr)
+      width = Prefix.WIDTH[version]
+      if prefixlen is None:
+          prefixlen = width
+      prefixlen = int(prefixlen)
+      if prefixlen < length:
+          return []
+      size = 1 << (width - prefixlen)
+      start, end = net, net + (1 << (width - length))
+      if version == 4 and prefixlen == width and length < 31:
+          start, end = start + 1, end - 1
+
+      free = []
+      gaps = [(other, other + (1 << (width - inner)))
+              for other, inner, id in self._inside(version, net, length)]
+      gaps.append((end, end))
+      for used_start, used_end in gaps:
+          # Aligned candidates before the next used range
+          candidate = -(-start // size) * size
+          while candidate + size <= min(used_start, end):
+              if prefixlen == width:
+                  free.append(Prefix.format_address(version, candidate))
+              else:
+                  free.append('%s/%d' % (Prefix.format_address(version, candidate),
+                                         prefixlen))
+              if len(free) >= count:
+                  return free
+              candidate += size
+          start = max(start, used_end)
+      return free
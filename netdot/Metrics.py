@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Metrics.py
+
+Request counters and latency histograms for netdot.Client hooks.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def url_template(url):
+    """
+    Returns url with its variable parts replaced, so that requests
+    to the same endpoint share one template, e.g.
+    '/host?name=foo' -> '/host?name={}' and '/device/12' -> '/device/{id}'
+    """
+    path, sep, query = url.partition('?')
+    path = '/'.join('{id}' if part.isdigit() else part
+                    for part in path.split('/'))
+    if not query:
+        return path
+    return path + '?' + '&'.join(param.split('=', 1)[0] + '={}'
+                                 for param in query.split('&'))
+
+class Histogram(object):
+  def __init__(self, buckets=BUCKETS):
+      self.buckets = buckets
+      self.counts = [0] * (len(buckets) + 1)
+      self.count = 0
+      self.sum = 0.0
+
+  def observe(self, value):
+      self.counts[bisect.bisect_left(self.buckets, value)] += 1
+      self.count += 1
+      self.sum += value
+
+  def cumulative(self):
+      """
+      Returns (upper bound, cumulative count) pairs, ending
+      with ('+Inf', count)
+      """
+      total = 0
+      pairs = []
+      for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+          total += count
+          pairs.append((bound, total))
+      return pairs
+
+class Metrics(object):
+  def __init__(self, buckets=BUCKETS):
+      """
+      Per-endpoint request counters and latency histograms fed
+      by Connect hooks.  Network time (request sent until body
+      received) and parse time (Util.parse_xml) are tracked
+      separately.
+
+      Usage:
+        metrics = netdot.Metrics.Metrics()
+        metrics.install(dot)
+        ...
+        print(metrics.prometheus())
+
+      Returns: netdot.Metrics.Metrics object.
+      """
+      self.buckets = buckets
+      self.requests = {}
+      self.errors = {}
+      self.bytes = {}
+      self.network = {}
+      self.parse = {}
+      self._lock = threading.Lock()
+
+  def install(self, dot):
+      """
+      Registers this object as the 'post' and 'parse' hook of a
+      netdot.Client.Connect object
+      """
+      dot.add_hook('post', self)
+      dot.add_hook('parse', self)
+
+  def __call__(self, event):
+      with self._lock:
+          template = event['template']
+          if event['hook'] == 'parse':
+              self._histogram(self.parse, template).observe(event['parse_time'])
+              return
+          key = (event['method'], template, str(event['status']))
+          self.requests[key] = self.requests.get(key, 0) + 1
+          if event.get('error') is not None:
+              self.errors[key] = self.errors.get(key, 0) + 1
+          if event.get('bytes'):
+              self.bytes[template] = self.bytes.get(template, 0) + event['bytes']
+          self._histogram(self.network, (event['method'], template)).observe(
+              event['network_time'])
+
+  def _histogram(self, histograms, key):
+      if key not in histograms:
+          histograms[key] = Histogram(self.buckets)
+      return histograms[key]
+
+  def summary(self):
+      """
+      Returns a dict of endpoint template to request count and
+      total/mean network and parse times, slowest first
+      """
+      with self._lock:
+          summary = {}
+          for (method, template), h in self.network.items():
+              entry = summary.setdefault(template, {'requests': 0, 'network_time': 0.0,
+                                                    'parse_time': 0.0, 'bytes': 0})
+              entry['requests'] += h.count
+              entry['network_time'] += h.sum
+              entry['bytes'] = self.bytes.get(template, 0)
+          for template, h in self.parse.items():
+              entry = summary.setdefault(template, {'requests': 0, 'network_time': 0.0,
+                                                    'parse_time': 0.0, 'bytes': 0})
+              entry['parse_time'] += h.sum
+      return summary
+
+  def prometheus(self, prefix='netdot_client'):
+      """
+      Returns the metrics in the Prometheus text exposition format
+      """
+      def labels(**kwargs):
+          return '{' + ','.join('%s="%s"' % (k, str(v).replace('"', '\\"'))
+                                for k, v in sorted(kwargs.items())) + '}'
+
+      lines = []
+      with self._lock:
+          lines.append('# TYPE %s_requests_total counter' % prefix)
+          for (method, template, status), count in sorted(self.requests.items()):
+              lines.append('%s_requests_total%s %d' % (
+                  prefix, labels(method=method, endpoint=template, status=status), count))
+          lines.append('# TYPE %s_errors_total counter' % prefix)
+          for (method, template, status), count in sorted(self.errors.items()):
+              lines.append('%s_errors_total%s %d' % (
+                  prefix, labels(method=method, endpoint=template, status=status), count))
+          lines.append('# TYPE %s_response_bytes_total counter' % prefix)
+          for template, count in sorted(self.bytes.items()):
+              lines.append('%s_response_bytes_total%s %d' % (
+                  prefix, labels(endpoint=template), count))
+          for name, histograms in (('network', self.network), ('parse', self.parse)):
+              metric = '%s_%s_seconds' % (prefix, name)
+              lines.append('# TYPE %s histogram' % metric)
+              for key, h in sorted(histograms.items()):
+                  if name == 'network':
+                      base = dict(method=key[0], endpoint=key[1])
+                  else:
+                      base = dict(endpoint=key)
+                  for bound, count in h.cumulative():
+                      lines.append('%s_bucket%s %d' % (metric, labels(le=bound, **base), count))
+                  lines.append('%s_sum%s %f' % (metric, labels(**base), h.sum))
+                  lines.append('%s_count%s %d' % (metric, labels(**base), h.count))
+      return '\n'.join(lines) + '\n'
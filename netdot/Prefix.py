@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Prefix.py
+
+IPv4/IPv6 address helpers and a longest-prefix-match index.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import socket
+import binascii
+
+WIDTH = {4: 32, 6: 128}
+FAMILY = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+def parse_address(address, version=None):
+    """
+    Converts an address to its integer value.
+
+    Arguments:
+      address -- Address as a string ("192.168.1.1", "2001:db8::1"),
+                 or as an integer / decimal string together with version
+      version -- 4 or 6, required for integer addresses
+
+    Returns:
+      Tuple of (version, integer)
+    """
+    if isinstance(address, int) or str(address).isdigit():
+        if version is None:
+            raise ValueError('IP version required for %s' % address)
+        return int(version), int(address)
+    version = 6 if ':' in address else 4
+    packed = socket.inet_pton(FAMILY[version], address)
+    return version, int(binascii.hexlify(packed), 16)
+
+def format_address(version, value):
+    """
+    Converts the integer value of an address back to a string
+    """
+    packed = binascii.unhexlify('%0*x' % (WIDTH[version] // 4, value))
+    return socket.inet_ntop(FAMILY[version], packed)
+
+def parse_prefix(cidr):
+    """
+    Splits a prefix in CIDR notation.  The host bits are cleared.
+
+    Usage:
+      Prefix.parse_prefix('192.168.1.0/24')
+
+    Returns:
+      Tuple of (version, network integer, prefix length)
+    """
+    if '/' in cidr:
+        address, prefixlen = cidr.split('/', 1)
+    else:
+        address, prefixlen = cidr, None
+    version, value = parse_address(address)
+    if prefixlen is None:
+        prefixlen = WIDTH[version]
+    prefixlen = int(prefixlen)
+    return version, network(version, value, prefixlen), prefixlen
+
+def network(version, value, prefixlen):
+    """
+    Returns value with the host bits of a prefix of
+    prefixlen cleared
+    """
+    shift = WIDTH[version] - prefixlen
+    return (value >> shift) << shift
+
+class PrefixIndex(object):
+  def __init__(self):
+      """
+      Longest-prefix-match index for IPv4 and IPv6 prefixes.
+      Prefixes are kept in one hash table per (version, prefix
+      length), so a lookup masks the address once per prefix
+      length in use, most specific first, instead of walking
+      a bit-wise trie.
+
+      Usage:
+        index = netdot.Prefix.PrefixIndex()
+        index.add('10.0.0.0', 8, 'ten')
+        index.add('10.1.0.0', 16, 'ten-one')
+        index.lookup('10.1.2.3')      # ('10.1.0.0', 16, 'ten-one')
+
+      Returns: netdot.Prefix.PrefixIndex object.
+      """
+      self._tables = {}
+      self._lengths = {4: [], 6: []}
+
+  def _key(self, address, prefixlen, version):
+      version, value = parse_address(address, version)
+      return version, network(version, value, int(prefixlen))
+
+  def add(self, address, prefixlen, value, version=None):
+      """
+      Adds (or replaces) the value stored for a prefix
+      """
+      version, net = self._key(address, prefixlen, version)
+      prefixlen = int(prefixlen)
+      table = self._tables.get((version, prefixlen))
+      if table is None:
+          table = self._tables[(version, prefixlen)] = {}
+          self._lengths[version] = sorted(self._lengths[version] + [prefixlen],
+                                          reverse=True)
+      table[net] = value
+
+  def remove(self, address, prefixlen, version=None):
+      """
+      Removes a prefix, if present
+      """
+      version, net = self._key(address, prefixlen, version)
+      table = self._tables.get((version, int(prefixlen)))
+      if table is not None:
+          table.pop(net, None)
+
+  def get(self, address, prefixlen, version=None, default=None):
+      """
+      Returns the value stored for exactly this prefix
+      """
+      version, net = self._key(address, prefixlen, version)
+      return self._tables.get((version, int(prefixlen)), {}).get(net, default)
+
+  def covering(self, address, version=None):
+      """
+      Yields every prefix containing address, most specific first
+
+      Returns:
+        Generator of (network, prefix length, value) tuples
+      """
+      version, value = parse_address(address, version)
+      for net, prefixlen, match in self.match(version, value):
+          yield format_address(version, net), prefixlen, match
+
+  def match(self, version, value):
+      """
+      Same as covering(), for an address already converted with
+      parse_address(); networks are yielded as integers
+      """
+      for prefixlen in self._lengths[version]:
+          net = network(version, value, prefixlen)
+          table = self._tables[(version, prefixlen)]
+          if net in table:
+              yield net, prefixlen, table[net]
+
+  def lookup(self, address, version=None):
+      """
+      Returns the longest prefix containing address
+
+      Returns:
+        (network, prefix length, value) tuple, or None
+      """
+      for match in self.covering(address, version):
+          return match
+      return None
+
+  def within(self, address, prefixlen, version=None):
+      """
+      Yields every prefix inside (or equal to) the given one
+
+      Returns:
+        Generator of (network, prefix length, value) tuples
+      """
+      version, net = self._key(address, prefixlen, version)
+      prefixlen = int(prefixlen)
+      for length in self._lengths[version]:
+          if length < prefixlen:
+              continue
+          for other, value in self._tables[(version, length)].items():
+              if network(version, other, prefixlen) == net:
+                  yield format_address(version, other), length, value
+
+  def __len__(self):
+      return sum(len(table) for table in self._tables.values())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+SessionStore.py
+
+Session cookie stores shared between processes.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def dump_cookies(jar):
+    """
+    Returns the cookies of a cookie jar as a list of dicts
+    """
+    return [{'name': c.name, 'value': c.value, 'domain': c.domain,
+             'path': c.path, 'expires': c.expires, 'secure': c.secure}
+            for c in jar]
+
+def load_cookies(jar, cookies):
+    """
+    Sets cookies, as returned by dump_cookies(), into a
+    requests cookie jar
+    """
+    for c in cookies:
+        jar.set(c['name'], c['value'], domain=c['domain'], path=c['path'],
+                expires=c['expires'], secure=c['secure'])
+
+def expired(cookies):
+    """
+    Tells whether any of the cookies has expired
+    """
+    now = time.time()
+    return any(c['expires'] and c['expires'] < now for c in cookies)
+
+class FileSessionStore(object):
+  def __init__(self, path):
+      """
+      Stores session cookies in a JSON file, so that several
+      processes can share one NetDot login.  Access is
+      serialized with an flock()ed lock file (POSIX only).
+
+      Arguments:
+        path -- JSON file, created if missing
+
+      Usage:
+        store = netdot.SessionStore.FileSessionStore('/var/run/app/netdot-session.json')
+        dot = netdot.Client.Connect(username, password, server, session_store=store)
+
+      Returns: netdot.SessionStore.FileSessionStore object.
+      """
+      if fcntl is None:
+          raise RuntimeError('FileSessionStore requires fcntl, which this '
+                             'platform lacks; use SqliteSessionStore instead')
+      self.path = path
+      self._lock = threading.RLock()
+      self._depth = 0
+      self._file = None
+
+  @contextmanager
+  def lock(self):
+      """
+      Holds an exclusive lock, across threads and processes.
+      The lock may be taken again by the thread holding it.
+      """
+      with self._lock:
+          if self._depth == 0:
+              f = open(self.path + '.lock', 'a')
+              try:
+                  fcntl.flock(f, fcntl.LOCK_EX)
+              except Exception:
+                  f.close()
+                  raise
+              self._file = f
+          self._depth += 1
+          try:
+              yield
+          finally:
+              self._depth -= 1
+              if self._depth == 0:
+                  fcntl.flock(self._file, fcntl.LOCK_UN)
+                  self._file.close()
+                  self._file = None
+
+  def _read(self):
+      try:
+          with open(self.path) as f:
+              return json.load(f)
+      except (IOError, OSError, ValueError):
+          return {}
+
+  def load(self, key):
+      """
+      Returns the cookies stored under key, or None
+      """
+      return self._read().get(key)
+
+  def save(self, key, cookies):
+      """
+      Stores cookies under key.  The file is replaced atomically.
+      """
+      with self._lock:
+          sessions = self._read()
+          if cookies is None:
+              sessions.pop(key, None)
+          else:
+              sessions[key] = cookies
+          fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+          with os.fdopen(fd, 'w') as f:
+              json.dump(sessions, f)
+          os.rename(tmp, self.path)
+
+  def clear(self, key):
+      """
+      Forgets the cookies stored under key
+      """
+      self.save(key, None)
+
+class SqliteSessionStore(object):
+  def __init__(self, path):
+      """
+      Stores session cookies in an sqlite database, so that
+      several processes can share one NetDot login.  Access is
+      serialized with sqlite's own locking.
+
+      Arguments:
+        path -- sqlite database file, created if missing
+
+      Usage:
+        store = netdot.SessionStore.SqliteSessionStore('/var/run/app/netdot.sqlite')
+        dot = netdot.Client.Connect(username, password, server, session_store=store)
+
+      Returns: netdot.SessionStore.SqliteSessionStore object.
+      """
+      self.path = path
+      self._lock = threading.RLock()
+      self._depth = 0
+      # Imported here, as only this store needs sqlite
+      import sqlite3
+      self._db = sqlite3.connect(path, timeout=60, isolation_level=None,
+                                 check_same_thread=False)
+      self._db.execute("""CREATE TABLE IF NOT EXISTS session (
+                            key TEXT PRIMARY KEY,
+                            cookies TEXT,
+                            stored REAL)""")
+
+  @contextmanager
+  def lock(self):
+      """
+      Holds an exclusive lock, across threads and processes
+      """
+      with self._lock:
+          self._depth += 1
+          if self._depth == 1:
+              self._db.execute("BEGIN IMMEDIATE")
+          try:
+              yield
+          finally:
+              self._depth -= 1
+              if self._depth == 0:
+                  self._db.execute("COMMIT")
+
+  def load(self, key):
+      """
+      Returns the cookies stored under key, or None
+      """
+      with self._lock:
+          row = self._db.execute("SELECT cookies FROM session WHERE key = ?",
+                                 (key,)).fetchone()
+      if row is None:
+          return None
+      return json.loads(row[0])
+
+  def save(self, key, cookies):
+      """
+      Stores cookies under key
+      """
+      with self._lock:
+          if cookies is None:
+              self._db.execute("DELETE FROM session WHERE key = ?", (key,))
+          else:
+              self._db.execute("INSERT OR REPLACE INTO session VALUES (?, ?, ?)",
+                               (key, json.dumps(cookies), time.time()))
+
+  def clear(self, key):
+      """
+      Forgets the cookies stored under key
+      """
+      self.save(key, None)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Snapshot.py
+
+Local, indexed copy of selected NetDot tables.
+
+Copyright (c) 2012 University of Oregon. All rights reserved.
+DISCLAIMER OF WARRANTY
+
+BECAUSE THIS SOFTWARE IS LICENSED FREE OF CHARGE, THERE IS NO WARRANTY
+FOR THE SOFTWARE, TO THE EXTENT PERMITTED BY APPLICABLE LAW. EXCEPT WHEN
+OTHERWISE STATED IN WRITING THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES
+PROVIDE THE SOFTWARE "AS IS" WITHOUT WARRANTY OF ANY KIND, EITHER
+EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ENTIRE RISK AS TO THE QUALITY AND PERFORMANCE OF THE SOFTWARE IS WITH
+YOU. SHOULD THE SOFTWARE PROVE DEFECTIVE, YOU ASSUME THE COST OF ALL
+NECESSARY SERVICING, REPAIR, OR CORRECTION.
+
+IN NO EVENT UNLESS REQUIRED BY APPLICABLE LAW OR AGREED TO IN WRITING
+WILL ANY COPYRIGHT HOLDER, OR ANY OTHER PARTY WHO MAY MODIFY AND/OR
+REDISTRIBUTE THE SOFTWARE AS PERMITTED BY THE ABOVE LICENCE, BE
+LIABLE TO YOU FOR DAMAGES, INCLUDING ANY GENERAL, SPECIAL, INCIDENTAL,
+OR CONSEQUENTIAL DAMAGES ARISING OUT OF THE USE OR INABILITY TO USE
+THE SOFTWARE (INCLUDING BUT NOT LIMITED TO LOSS OF DATA OR DATA BEING
+RENDERED INACCURATE OR LOSSES SUSTAINED BY YOU OR THIRD PARTIES OR A
+FAILURE OF THE SOFTWARE TO OPERATE WITH ANY OTHER SOFTWARE), EVEN IF
+SUCH HOLDER OR OTHER PARTY HAS BEEN ADVISED OF THE POSSIBILITY OF
+SUCH DAMAGES.
+"""
+
+import time
+import threading
+from netdot import Util
+from netdot import Prefix
+
+# Object classes loaded by default and the fields indexed for each
+INDEXES = {
+    'RR': ('name', 'zone'),
+    'Ipblock': ('address', 'parent', 'interface', 'status'),
+    'Device': ('name', 'asset_id'),
+    'Interface': ('device', 'name'),
+    'InterfaceVlan': ('interface', 'vlan'),
+}
+
+# Modification timestamp fields, in order of preference
+TIMESTAMPS = ('modified', 'last_updated', 'last_seen')
+
+# Fraction of a table's rows replaced or deleted by sync() after
+# which the table's pool of shared values is pruned
+PRUNE_FRACTION = 0.25
+
+class Snapshot(object):
+  def __init__(self, dot, objects=None, page_size=10000):
+      """
+      Local copy of selected NetDot object classes with hash
+      indexes on id, name and foreign keys, plus a prefix index
+      over Ipblocks.  Answers the read-only get_object_by_*
+      lookups of Connect from memory; call refresh() to reload
+      from the server.  The RR and Ipblock lookups return rows of
+      those classes, not the /host view Connect's host lookups
+      return (see get_rr_by_name()).
+
+      Arguments:
+        dot -- netdot.Client.Connect object used for loading
+        objects -- Object classes to load (defaults to RR, Ipblock,
+                   Device, Interface and InterfaceVlan)
+        page_size -- Rows requested per page while loading
+
+      Usage:
+        snap = netdot.Snapshot.Snapshot(dot)
+        snap.refresh()
+        rrs = snap.get_rr_by_name('foo')
+
+      Returns: netdot.Snapshot.Snapshot object.
+      """
+      self.dot = dot
+      self.objects = list(objects or sorted(INDEXES))
+      self.page_size = page_size
+      self.tables = {}
+      self.indexes = {}
+      self.prefixes = Prefix.PrefixIndex()
+      self.loaded = None
+      self.marks = {}
+      self.churn = {}
+      self._lock = threading.RLock()
+
+  def refresh(self, objects=None):
+      """
+      Reloads the given object classes (all by default).  The new
+      tables and indexes are built aside and swapped in at the end,
+      so lookups keep working during a refresh.
+      """
+      tables = {}
+      indexes = {}
+      for object in (objects or self.objects):
+          table = tables[object] = Util.Table()
+          index = indexes[object] = dict((field, {}) for field in
+                                         ('id',) + INDEXES.get(object, ()))
+          for tag, id, attrib in self.dot.iter_objects(object.lower(),
+                                                       page_size=self.page_size):
+              table.add(attrib)
+              self._index(index, table[id])
+      with self._lock:
+          self.tables.update(tables)
+          self.indexes.update(indexes)
+          for object, table in tables.items():
+              self.marks[object] = self._marks(table)
+              self.churn[object] = 0
+          if 'Ipblock' in tables:
+              self.prefixes = self._build_prefixes(tables['Ipblock'])
+          self.loaded = time.time()
+
+  def sync(self, objects=None):
+      """
+      Brings loaded object classes up to date without rebuilding
+      them.  The whole table is still streamed from the server
+      and every row checked against the local copy, but only new,
+      changed and deleted rows touch the tables and indexes.  Rows
+      whose modification timestamp is unchanged and not newer
+      than the table's latest one are recognised by that field
+      alone; the others are compared field by field.  Deletions
+      are found by comparing id sets; since rows can be missed by
+      a walk racing with writes, the ids not seen are looked up
+      one by one, and only the ones the server answers 404 for
+      are deleted.  Classes that were never loaded are loaded in
+      full.
+
+      Usage:
+        changes = snap.sync()
+
+      Returns:
+        dict of object class to {'added': n, 'changed': n, 'deleted': n}
+      """
+      changes = {}
+      for object in (objects or self.objects):
+          if object not in self.tables:
+              self.refresh([object])
+              changes[object] = {'added': len(self.tables[object]),
+                                 'changed': 0, 'deleted': 0}
+          else:
+              changes[object] = self._sync(object)
+      self.loaded = time.time()
+      return changes
+
+  def _sync(self, object):
+      table = self.tables[object]
+      index = self.indexes[object]
+      mark = self.marks.get(object, {})
+      field = mark.get('timestamp')
+      seen = set()
+      counts = {'added': 0, 'changed': 0, 'deleted': 0}
+      new_mark = {}
+      if field:
+          new_mark['timestamp'] = field
+          new_mark['modified'] = ''
+      for tag, id, attrib in self.dot.iter_objects(object.lower(),
+                                                   page_size=self.page_size):
+          seen.add(id)
+          if field:
+              new_mark['modified'] = max(new_mark['modified'], attrib.get(field) or '')
+          record = table.get(id)
+          if record is not None:
+              if (field and record.get(field) == attrib.get(field) and
+                      attrib.get(field, '') <= mark.get('modified', '')):
+                  continue
+          self._apply(object, attrib, counts)
+
+      # Rows missing from the walk may have been skipped rather
+      # than deleted; check them directly
+      missing = set(table) - seen
+      if missing:
+          data, errors = self.dot.get_many(object.lower(), missing)
+          for id, attrib in data.get(object, {}).items():
+              missing.discard(id)
+              self._apply(object, attrib, counts)
+          for id, error in errors.items():
+              response = getattr(error, 'response', None)
+              if response is None or response.status_code != 404:
+                  missing.discard(id)
+      with self._lock:
+          for id in missing:
+              self._remove(object, table.pop(id))
+          counts['deleted'] = len(missing)
+          self.marks[object] = new_mark
+          self.churn[object] = (self.churn.get(object, 0) +
+                                counts['changed'] + counts['deleted'])
+          if self.churn[object] > len(table) * PRUNE_FRACTION:
+              table.prune()
+              self.churn[object] = 0
+      return counts
+
+  def _apply(self, object, attrib, counts):
+      """
+      Adds a new row, or replaces a changed one
+      """
+      table = self.tables[object]
+      record = table.get(attrib['id'])
+      if record is not None and record == attrib:
+          return
+      with self._lock:
+          if record is not None:
+              self._remove(object, record)
+              counts['changed'] += 1
+          else:
+              counts['added'] += 1
+          table.add(attrib)
+          self._insert(object, table[attrib['id']])
+
+  def _marks(self, table):
+      """
+      High-water mark of a table: when the class has a
+      modification timestamp, the field and its latest value
+      """
+      mark = {}
+      for record in table.values():
+          for field in TIMESTAMPS:
+              if field in record:
+                  mark['timestamp'] = field
+                  break
+          break
+      if 'timestamp' in mark:
+          mark['modified'] = max(record.get(mark['timestamp']) or ''
+                                 for record in table.values())
+      return mark
+
+  def _insert(self, object, record):
+      self._index(self.indexes[object], record)
+      if object == 'Ipblock':
+          args = self._prefix_args(record)
+          if args:
+              address, prefixlen, version = args
+              self.prefixes.add(address, prefixlen, record['id'], version)
+
+  def _remove(self, object, record):
+      self._unindex(self.indexes[object], record)
+      if object == 'Ipblock':
+          args = self._prefix_args(record)
+          if args:
+              address, prefixlen, version = args
+              self.prefixes.remove(address, prefixlen, version)
+
+  def _index(self, index, record):
+      for field, values in index.items():
+          for key in Util.index_keys(record, field):
+              values.setdefault(key, set()).add(record['id'])
+
+  def _unindex(self, index, record):
+      for field, values in index.items():
+          for key in Util.index_keys(record, field):
+              ids = values.get(key)
+              if ids is not None:
+                  ids.discard(record['id'])
+                  if not ids:
+                      del values[key]
+
+  def _prefix_args(self, record):
+      version = record.get('version')
+      prefixlen = record.get('prefix')
+      if not record.get('address') or not prefixlen:
+          return None
+      return record['address'], prefixlen, version
+
+  def _build_prefixes(self, table):
+      prefixes = Prefix.PrefixIndex()
+      for id, record in table.items():
+          args = self._prefix_args(record)
+          if args:
+              address, prefixlen, version = args
+              prefixes.add(address, prefixlen, id, version)
+      return prefixes
+
+  def _select(self, object, field, value):
+      # Readers hold the lock too, as sync() updates the tables
+      # and indexes in place
+      with self._lock:
+          object = self._tag(object)
+          ids = self.indexes.get(object, {}).get(field)
+          if ids is None:
+              # Not indexed, fall back to a scan
+              ids = set(id for id, record in self.tables[object].items()
+                        if value in Util.index_keys(record, field))
+          else:
+              ids = ids.get(str(value), ())
+          return self._result(object, ids)
+
+  def _result(self, object, ids):
+      with self._lock:
+          table = self.tables[object]
+          if not ids:
+              return {}
+          return {object: dict((id, table[id]) for id in ids)}
+
+  def _tag(self, object):
+      for tag in self.tables:
+          if tag.lower() == object.lower():
+              return tag
+      raise KeyError('%s is not loaded in this snapshot' % object)
+
+  def get_object_by_id(self, object, id):
+      """
+      Same as Connect.get_object_by_id(), answered locally
+      """
+      return self._select(object, 'id', id)
+
+  def get_object_by_name(self, object, name):
+      """
+      Same as Connect.get_object_by_name(), answered locally
+      """
+      return self._select(object, 'name', name)
+
+  def get_object_by_filter(self, object, field, value):
+      """
+      Same as Connect.get_object_by_filter(), answered locally.
+      Foreign key fields match either the label or the id.
+      """
+      return self._select(object, field, value)
+
+  def get_rr_by_name(self, name):
+      """
+      Returns the RR rows named name, as {'RR': {id: record}}.
+      Unlike Connect.get_host_by_name(), which queries NetDot's
+      /host view, this does not bring the addresses of the
+      records; look them up with get_ipblock_by_address() or
+      get_object_by_filter().
+      """
+      return self._select('RR', 'name', name)
+
+  def get_ipblock_by_address(self, address):
+      """
+      Returns the Ipblock row of an address, as
+      {'Ipblock': {id: record}}.  Unlike Connect.get_host_address(),
+      which queries the /host view, the address's RR records
+      are not included.
+      """
+      return self._select('Ipblock', 'address', address)
+
+  def get_ipblock_children(self, ipblock):
+      """
+      Returns the Ipblock rows directly inside a subnet, given in
+      CIDR notation, as {'Ipblock': {id: record}}.  Unlike
+      Connect.get_ipblock(), which returns the /host view of the
+      subnet's addresses and their records, these are the child
+      blocks themselves, subnets as well as addresses.
+      """
+      version, net, prefixlen = Prefix.parse_prefix(ipblock)
+      with self._lock:
+          id = self.prefixes.get(net, prefixlen, version)
+      if id is None:
+          return {}
+      return self._select('Ipblock', 'parent', id)
+
+  def get_block_by_address(self, address):
+      """
+      Returns the most specific Ipblock (other than the address
+      itself) containing address, using the prefix index
+      """
+      version, value = Prefix.parse_address(address)
+      with self._lock:
+          for net, prefixlen, id in self.prefixes.covering(value, version):
+              if prefixlen < Prefix.WIDTH[version]:
+                  return self._result('Ipblock', [id])
+      return {}
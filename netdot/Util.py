@@ -32,15 +32,164 @@ SUCH DAMAGES.
 import os
 import sys
 import re
+import random
 import xml.etree.ElementTree as ET
+try:
+    from urllib import urlencode
+except ImportError:
+    from urllib.parse import urlencode
+try:
+    # C implementation of ElementTree on Python 2
+    import xml.etree.cElementTree as cET
+except ImportError:
+    cET = ET
+try:
+    from xml.parsers import expat
+except ImportError:
+    expat = None
+# lxml and multiprocessing.pool are slow to import and often not
+# needed, so they are imported on first use
+lxml_etree = None
+
+try:
+    intern
+except NameError:
+    from sys import intern
 
 class NetdotError(Exception):
     pass
 
+class Record(object):
+    """
+    Compact, read-only stand-in for the attribute dict of a
+    NetDot object.  The field names live in a schema shared by
+    every record of the same shape, so a record only holds a
+    tuple of values.  Supports the usual read-only dict access:
+    record['name'], record.get(), keys(), items(), in, len().
+    """
+    __slots__ = ('_fields', '_values')
+
+    def __init__(self, fields, values):
+        self._fields = fields
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._fields[key]]
+
+    def get(self, key, default=None):
+        index = self._fields.get(key)
+        if index is None:
+            return default
+        return self._values[index]
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._values)
+
+    def keys(self):
+        return sorted(self._fields, key=self._fields.get)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self.keys(), self._values))
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+class Table(dict):
+    """
+    dict of object id to Record, as returned per tag by
+    parse_xml(xml, compact=True)
+    """
+    def __init__(self):
+        dict.__init__(self)
+        self._schemas = {}
+        self._values = {}
+
+    def add(self, attrib, id=None):
+        names = tuple(attrib.keys())
+        fields = self._schemas.get(names)
+        if fields is None:
+            fields = dict((intern(str(name)), index)
+                          for index, name in enumerate(names))
+            self._schemas[names] = fields
+        # Share equal values (states, foreign keys, flags, ...)
+        # between records
+        values = list(attrib.values())
+        self[attrib['id'] if id is None else id] = Record(fields, tuple(
+            map(self._values.setdefault, values, values)))
+
+    def prune(self):
+        """
+        Drops the pooled values no longer used by any record,
+        e.g. after records were replaced or removed
+        """
+        values = {}
+        for record in dict.values(self):
+            for value in record._values:
+                values.setdefault(value, value)
+        self._values = values
+
+class Projection(object):
+    """
+    Compiled field selection: a callable returning the fields of
+    an attribute dict whose names match one of the patterns.
+    Whether a field name matches is only worked out once.
+    """
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.pattern = re.compile("(" + ")|(".join(self.fields) + ")")
+        self._matches = {}
+
+    def match(self, field):
+        matched = self._matches.get(field)
+        if matched is None:
+            matched = self.pattern.match(field) is not None
+            self._matches[field] = matched
+        return matched
+
+    def __call__(self, attrib):
+        return dict((k, v) for k, v in attrib.items() if self.match(k))
+
+_projections = {}
+
+def projection(fields):
+    """
+    Returns the (cached) Projection of a list of field patterns
+    """
+    key = tuple(fields)
+    project = _projections.get(key)
+    if project is None:
+        project = _projections[key] = Projection(key)
+    return project
+
 def filter_dict(dict, kword):
     """
     This function descends into the Multi-level
-    dictionary and returns a list of [filtered] key value pairs
+    dictionary and returns a list of [filtered] key value pairs.
+    Only the fields matching one of the keywords (regular
+    expressions, matched at the start of the field name) are
+    kept; with no keywords every field is kept.  To avoid
+    building unwanted fields in the first place, pass the
+    keywords as fields to parse_xml() or Connect.get() instead.
     
     Usage:
       dot.filter_dict(dict, ['list', 'of', '.*keywords'])
@@ -48,42 +197,59 @@ def filter_dict(dict, kword):
     Returns:
       Multi-level dictionary on success
     """
+    project = projection(kword) if kword else None
     data = {}
     for top_k, top_v in dict.items():
       data[top_k] = {}
       for mid_k, mid_v in top_v.items():
-        data[top_k][mid_k] = {}
-        for bot_k, bot_v in mid_v.items():
-          if kword:
-            re_comb = "(" + ")|(".join(kword) + ")"
-            if re.match(re_comb, bot_k):
-              data[top_k][mid_k][bot_k] = bot_v
-            else:
-              data[top_k][mid_k][bot_k] = bot_v
+        if project:
+          data[top_k][mid_k] = project(mid_v)
+        else:
+          data[top_k][mid_k] = {}
+          data[top_k][mid_k].update(mid_v.items())
     return data
 
 def validate_xml(content):
-    if '<opt' not in content:
+    marker = b'<opt' if isinstance(content, bytes) else u'<opt'
+    if marker not in content:
         raise NetdotError(content)
   
-def parse_xml(xml):
+def _parse_etree(xml, compact, project=None):
     """
-    This is a VERY simple parser specifically built to 
-    parse the NetDot-XML Objects
-        
-    Returns: 
-      Multi-level dictionary.
+    ElementTree backend of parse_xml(): builds the whole
+    element tree, then walks it.
     """
-    validate_xml(xml)
     data = {}
-    xml_root = ET.fromstring(xml)
+    try:
+        xml_root = cET.fromstring(xml)
+    except SyntaxError:
+        # ParseError, which derives from SyntaxError
+        raise NetdotError(xml)
+    if xml_root.tag != 'opt':
+        raise NetdotError(xml)
     if xml_root.attrib:
         # root has attributes, so we're likely
         # receiving a single object
         data = xml_root.attrib
+        if project:
+            data = project(data)
+    elif project:
+        for child in xml_root:
+            if child.tag not in data:
+                data[child.tag] = Table() if compact else {}
+            if compact:
+                data[child.tag].add(project(child.attrib), child.attrib["id"])
+            else:
+                data[child.tag][child.attrib["id"]] = project(child.attrib)
     else:
         # No root attributes means that we're
         # receiving a list of objects
+        if compact:
+            for child in xml_root:
+                if child.tag not in data:
+                    data[child.tag] = Table()
+                data[child.tag].add(child.attrib)
+            return data
         for child in xml_root:
             if child.tag in data:
                 data[child.tag][child.attrib["id"]] = child.attrib
@@ -93,7 +259,312 @@ def parse_xml(xml):
     
     return data
 
+def _fixtext(text):
+    # Python 2 ElementTree returns ASCII text as str, not unicode
+    try:
+        return text.encode('ascii')
+    except UnicodeError:
+        return text
+
+def _parse_expat(xml, compact, project=None):
+    """
+    expat backend of parse_xml(): builds the dictionary from the
+    parser callbacks in a single pass, without an element tree.
+    The root element is checked as it is parsed, replacing the
+    separate validate_xml() scan.
+    """
+    data = {}
+    root = []
+    depth = [0]
+    parser = expat.ParserCreate()
+    fix = False
+    if sys.version_info[0] < 3:
+        # Match Python 2 ElementTree, which returns ASCII text as
+        # str: for ASCII-only documents (the norm) expat can return
+        # str directly, otherwise every string needs converting.
+        try:
+            xml.decode('ascii')
+            parser.returns_unicode = False
+        except UnicodeError:
+            fix = True
+
+    def start(tag, attrib):
+        depth[0] += 1
+        if fix:
+            tag = _fixtext(tag)
+            attrib = dict((_fixtext(k), _fixtext(v)) for k, v in attrib.items())
+        if depth[0] == 2:
+            id = attrib["id"]
+            if project:
+                attrib = project(attrib)
+            if compact:
+                if tag not in data:
+                    data[tag] = Table()
+                data[tag].add(attrib, id)
+            else:
+                if tag not in data:
+                    data[tag] = {}
+                data[tag][id] = attrib
+        elif depth[0] == 1:
+            if tag != 'opt':
+                raise NetdotError(xml)
+            root.append(project(attrib) if project and attrib else attrib)
+
+    def end(tag):
+        depth[0] -= 1
+
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.Parse(xml, True)
+    except expat.ExpatError:
+        raise NetdotError(xml)
+    if root and root[0]:
+        # root has attributes, so we're likely
+        # receiving a single object
+        return root[0]
+    return data
+
+def _parse_lxml(xml, compact, project=None):
+    """
+    lxml backend of parse_xml(): the tree is built in C, only
+    the attribute dicts are built in Python.
+    """
+    try:
+        xml_root = lxml_etree.fromstring(xml)
+    except lxml_etree.XMLSyntaxError:
+        raise NetdotError(xml)
+    if xml_root.tag != 'opt':
+        raise NetdotError(xml)
+    if xml_root.attrib:
+        # root has attributes, so we're likely
+        # receiving a single object
+        if project:
+            return project(dict(xml_root.attrib))
+        return dict(xml_root.attrib)
+    data = {}
+    for child in xml_root:
+        tag = child.tag
+        if not isinstance(tag, str):
+            # comments and processing instructions
+            continue
+        if tag not in data:
+            data[tag] = Table() if compact else {}
+        attrib = dict(child.items())
+        id = attrib["id"]
+        if project:
+            attrib = project(attrib)
+        if compact:
+            data[tag].add(attrib, id)
+        else:
+            data[tag][id] = attrib
+    return data
+
+def _import_lxml():
+    global lxml_etree
+    if lxml_etree is None:
+        try:
+            from lxml import etree
+        except ImportError:
+            return False
+        lxml_etree = etree
+    return True
+
+PARSERS = {'etree': _parse_etree, 'lxml': _parse_lxml}
+if expat is not None:
+    PARSERS['expat'] = _parse_expat
+
+# Backend used by parse_xml(), the first one available of expat
+# (single pass, no tree, so the lowest peak memory and as fast as
+# the C ElementTree), lxml and ElementTree.  lxml is slower than
+# expat on NetDot's attribute-only documents, since converting
+# its attribute proxies to dicts costs more than the C parse saves.
+if expat is not None:
+    PARSER = 'expat'
+elif _import_lxml():
+    PARSER = 'lxml'
+else:
+    PARSER = 'etree'
+
+def set_parser(name):
+    """
+    Selects the parse_xml() backend: 'lxml' (when installed),
+    'expat' or 'etree'.
+    """
+    global PARSER
+    if name not in PARSERS or (name == 'lxml' and not _import_lxml()):
+        raise ValueError('Unknown or unavailable parser: %s' % name)
+    PARSER = name
+
+def parse_xml(xml, compact=False, fields=None):
+    """
+    This is a VERY simple parser specifically built to 
+    parse the NetDot-XML Objects.  The work is done by the
+    backend selected in PARSER (see set_parser()).
+
+    Arguments:
+      xml -- NetDot-XML string
+      compact -- If True, objects in a list are stored as
+                 Records in per-tag Tables instead of one
+                 attribute dict each, which takes several
+                 times less memory for large results
+      fields -- Optional list of field patterns, as taken by
+                filter_dict(); only the matching fields are kept,
+                filtered while parsing
+        
+    Returns: 
+      Multi-level dictionary.
+    """
+    return PARSERS[PARSER](xml, compact, projection(fields) if fields else None)
+
+def iter_xml(source):
+    """
+    Incremental counterpart of parse_xml().  Parses a file-like
+    object with iterparse and yields one object at a time,
+    discarding each element once it has been handed out, so
+    memory use does not grow with the size of the response.
+    The source is closed once it is exhausted, or when the
+    generator is closed.
+
+    Arguments:
+      source -- File-like object holding NetDot-XML
+
+    Usage:
+      for tag, id, attrib in Util.iter_xml(response.raw):
+        ...
+
+    Returns:
+      Generator of (tag, id, attrib) tuples
+    """
+    root = None
+    root_attrib = None
+    depth = 0
+    try:
+        for event, elem in cET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if root is None:
+                    if elem.tag != 'opt':
+                        raise NetdotError('Unexpected root element: ' + elem.tag)
+                    root = elem
+                    root_attrib = dict(elem.attrib)
+                continue
+            depth -= 1
+            if depth == 1:
+                yield elem.tag, elem.attrib.get('id'), elem.attrib
+                root.clear()
+            elif depth == 0 and root_attrib:
+                # root has attributes, so we're likely
+                # receiving a single object
+                yield root.tag, root_attrib.get('id'), root_attrib
+    except SyntaxError as e:
+        # ParseError, which derives from SyntaxError
+        raise NetdotError(str(e))
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+
+def _query_value(value):
+    if isinstance(value, bytes):
+        return value
+    return (u'%s' % value).encode('utf-8')
+
+def query_url(object, filters=None):
+    """
+    Builds the URL selecting the rows of an object class that
+    match every field=value filter.  Values are UTF-8 and URL
+    encoded, so '&', '/', spaces etc. are safe, and filters are
+    sorted so equal queries give equal URLs (and share cache
+    entries).
+
+    Arguments:
+      object -- 'device', 'interface', 'rr', etc...
+      filters -- Dictionary of field => value
+
+    Usage:
+      Util.query_url('interface', {'device': 12, 'name': 'Gi1/0/1'})
+      # '/interface?device=12&name=Gi1%2F0%2F1'
+
+    Returns:
+      URL path and query string
+    """
+    if not filters:
+        return "/" + object
+    params = [(field, _query_value(value))
+              for field, value in sorted(filters.items())]
+    return "/" + object + "?" + urlencode(params)
+
+def concurrent_map(func, items, workers):
+    """
+    Applies func to every item using a bounded pool of
+    worker threads.  Items are handed to the workers one
+    at a time, so a slow call holds up no other item.
+    Results are returned in the same order as the
+    supplied items.
+
+    Arguments:
+      func -- Callable taking a single item
+      items -- Iterable of items
+      workers -- Maximum number of concurrent calls
+
+    Usage:
+      results = Util.concurrent_map(func, items, 8)
+
+    Returns:
+      List of results
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(func, items, 1)
+    finally:
+        pool.close()
+        pool.join()
+
+def merge_data(data, new):
+    """
+    Merges a multi-level dictionary as returned by parse_xml()
+    into data, in place.
+
+    Returns:
+      The updated data dictionary
+    """
+    for tag, objects in new.items():
+        if isinstance(objects, dict):
+            data.setdefault(tag, {}).update(objects)
+    return data
+
+def index_keys(attrib, field):
+    """
+    Returns the keys a field is indexed under: its value, and
+    for foreign keys also the id from the matching _xlink
+    attribute (e.g. device_xlink="Device/12"), so lookups work
+    by label or by id.
+    """
+    keys = []
+    value = attrib.get(field)
+    if value:
+        keys.append(value)
+    xlink = attrib.get(field + '_xlink')
+    if xlink:
+        id = xlink.rsplit('/', 1)[-1]
+        if id != value:
+            keys.append(id)
+    return keys
+
+def backoff(attempt, factor):
+    """
+    Returns the delay before retry number attempt (starting
+    at 0): exponential in attempt, with full jitter so that
+    concurrent clients don't retry in lock step.
+    """
+    return random.uniform(0, factor * (2 ** attempt))
+
 def dump(object):
-    for property, value in vars(object).iteritems():
-      print property, ": ", value  
+    for property, value in vars(object).items():
+      print("%s :  %s" % (property, value))  
   
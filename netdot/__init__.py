@@ -31,5 +31,31 @@ SUCH DAMAGES.
 
 __version__ = '0.03' ## Not always updated
 
-import netdot.Util
-import netdot.Client
+import sys
+
+# Submodules.  On Python 3.7+ they are imported on first use
+# (PEP 562), so a script that only needs e.g. netdot.Util does
+# not pay for importing requests; older versions import them
+# all up front.
+__all__ = ['Util', 'Client', 'Cache', 'Ipam', 'Metrics', 'Prefix',
+           'SessionStore', 'Snapshot']
+
+if sys.version_info >= (3, 7):
+    import importlib
+
+    def __getattr__(name):
+        if name in __all__:
+            return importlib.import_module('netdot.' + name)
+        raise AttributeError("module 'netdot' has no attribute %r" % name)
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    import netdot.Util
+    import netdot.Client
+    import netdot.Cache
+    import netdot.Ipam
+    import netdot.Metrics
+    import netdot.Prefix
+    import netdot.SessionStore
+    import netdot.Snapshot
@@ -18,4 +18,7 @@ setup(name="netdot-client",
     install_requires=[
         "requests>=1.0",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.0"],
+    },
 )
@@ -0,0 +1,220 @@
+"""
+Shared fixtures: an in-memory stand-in for the NetDot REST server
+"""
+
+import os
+import sys
+import threading
+from io import BytesIO
+from xml.sax.saxutils import quoteattr
+import pytest
+import requests
+try:
+    from urlparse import urlparse, parse_qsl
+except ImportError:
+    from urllib.parse import urlparse, parse_qsl
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs
+from netdot import Client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'benchmarks'))
+import fake_server
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError('%d' % status, response=response)
+
+class FakeConnect(Client.Connect):
+  """
+  Connect serving GETs from in-memory rows, with NetDot's
+  filtering, limit/offset paging and 404 for empty results.
+  Logs nothing in and sends nothing.  rows are served for
+  every object class, unless tables maps the class to its
+  own (tag, rows).  With paging False, limit and offset are
+  ignored, as by servers that don't support them.  POSTs and
+  DELETEs are only recorded in writes.
+  """
+  def __init__(self, tag, rows, tables=None):
+      self.tag = tag
+      self.rows = rows
+      self.tables = tables or {}
+      self.urls = []
+      self.before_get = None
+      self.writes = []
+      self.before_write = None
+      self.errors = {}
+      self.paging = True
+      self.flights = None
+      self.hooks = {'pre': [], 'post': [], 'parse': []}
+      self.workers = 1
+      self.retries = 2
+      self.backoff = 0
+
+  def get_xml(self, url, stream=False):
+      self.urls.append(url)
+      if self.before_get:
+          self.before_get(url)
+      if url in self.errors:
+          raise http_error(self.errors[url])
+      parts = urlparse(url)
+      tag, rows = self.tables.get(parts.path.strip('/'), (self.tag, self.rows))
+      params = dict(parse_qsl(parts.query))
+      limit = int(params.pop('limit', 0)) or None
+      offset = int(params.pop('offset', 0))
+      rows = [row for row in rows
+              if all(row.get(field) == value for field, value in params.items())]
+      if self.paging:
+          rows = rows[offset:offset + limit if limit else None]
+      if not rows:
+          raise http_error(404)
+      content = ('<opt>%s</opt>' % ''.join(
+          '<%s %s />' % (tag, ' '.join('%s=%s' % (field, quoteattr(value))
+                                      for field, value in sorted(row.items())))
+          for row in rows)).encode('utf-8')
+      return BytesIO(content) if stream else content
+
+  def post(self, url, data):
+      return self._write('POST', url, data)
+
+  def delete(self, url):
+      return self._write('DELETE', url, None)
+
+  def _write(self, method, url, data):
+      self.writes.append((method, url, data))
+      if self.before_write:
+          self.before_write(method, url, data)
+      if url in self.errors:
+          raise http_error(self.errors[url])
+      return ('<opt id="%d" />' % len(self.writes)).encode('utf-8')
+
+@pytest.fixture
+def hosts():
+    return FakeConnect('RR', [{'id': str(i), 'name': 'host%d' % i, 'zone': 'example.com'}
+                              for i in range(1, 31)])
+
+def topology_tables(devices=3, ports=4, vlans=3):
+    """
+    Device, Interface, InterfaceVlan, Vlan and Ipblock rows
+    shaped like benchmarks/fake_server.py's: every device has
+    ports interfaces, and every interface but the last of each
+    device (an SVI) is in one VLAN and has one address.
+    """
+    interfaces = [{'id': str(i), 'name': 'Gi1/0/%d' % ((i - 1) % ports + 1),
+                   'device': str((i - 1) // ports + 1),
+                   'device_xlink': 'Device/%d' % ((i - 1) // ports + 1)}
+                  for i in range(1, devices * ports + 1)]
+    switched = [row for row in interfaces if int(row['id']) % ports]
+    return {
+        'device': ('Device', [{'id': str(d), 'name': 'switch%d' % d}
+                              for d in range(1, devices + 1)]),
+        'interface': ('Interface', interfaces),
+        'interfacevlan': ('InterfaceVlan', [
+            {'id': row['id'], 'interface': row['id'],
+             'interface_xlink': 'Interface/' + row['id'],
+             'vlan': str(int(row['id']) % vlans + 1),
+             'vlan_xlink': 'Vlan/%d' % (int(row['id']) % vlans + 1)}
+            for row in switched]),
+        'vlan': ('Vlan', [{'id': str(v), 'vid': str(100 + v), 'name': 'vlan%d' % v}
+                          for v in range(1, vlans + 1)]),
+        'ipblock': ('Ipblock', [
+            {'id': row['id'], 'address': '10.0.0.%s' % row['id'], 'prefix': '32',
+             'interface': row['id'], 'interface_xlink': 'Interface/' + row['id']}
+            for row in switched]),
+    }
+
+@pytest.fixture
+def topology():
+    return FakeConnect('RR', [], topology_tables())
+
+@pytest.fixture(scope='session')
+def server():
+    """
+    Url of a benchmarks/fake_server.py server with 480 rows (10
+    devices), run in a thread for the whole session
+    """
+    ready = queue.Queue()
+    thread = threading.Thread(target=fake_server.serve, args=(480, 0.0, 0, ready))
+    thread.daemon = True
+    thread.start()
+    return ready.get(timeout=10)
+
+class AuthHandler(BaseHTTPRequestHandler):
+  """
+  NetDot stand-in checking the session cookie: a login hands out
+  a new session, which expire() invalidates.  Requests without
+  the current session get a 401, or with redirect set a
+  redirect to the login page.
+  """
+  protocol_version = 'HTTP/1.1'
+
+  def log_message(self, *args):
+      pass
+
+  def reply(self, status, body=b'<opt></opt>', headers=()):
+      self.send_response(status)
+      for name, value in headers:
+          self.send_header(name, value)
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+  def do_POST(self):
+      body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+      if self.path.endswith('/NetdotLogin'):
+          form = parse_qs(body.decode('utf-8'))
+          if form.get('credential_1') != ['secret']:
+              return self.reply(403, b'denied')
+          with self.server.lock:
+              self.server.logins += 1
+              self.server.session = 'session%d' % self.server.logins
+          return self.reply(200, b'ok', [('Set-Cookie', 'netdot_auth=%s; Path=/'
+                                                        % self.server.session)])
+      self.rest()
+
+  def do_GET(self):
+      if self.path.endswith('/NetdotLogin'):
+          return self.reply(200, b'<html>login</html>')
+      self.rest()
+
+  def rest(self):
+      cookie = 'netdot_auth=%s' % self.server.session
+      if cookie not in self.headers.get('Cookie', '').split('; '):
+          self.server.refused += 1
+          if self.server.redirect:
+              return self.reply(302, b'', [('Location', '/netdot/NetdotLogin')])
+          return self.reply(401, b'expired')
+      self.server.served += 1
+      self.reply(200)
+
+class AuthServer(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+  def expire(self):
+      self.session = 'expired'
+
+@pytest.fixture
+def auth_server():
+    server = AuthServer(('127.0.0.1', 0), AuthHandler)
+    server.lock = threading.Lock()
+    server.session = None
+    server.logins = server.refused = server.served = 0
+    server.redirect = False
+    server.url = 'http://127.0.0.1:%d/netdot' % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
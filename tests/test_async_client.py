@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+
+pytest.importorskip('aiohttp')
+from netdot import Client
+from netdot.AsyncClient import AsyncConnect
+
+def run(server, method, *args, **kwargs):
+    async def call():
+        async with AsyncConnect('user', 'secret', server) as dot:
+            return await getattr(dot, method)(*args, **kwargs)
+    return asyncio.run(call())
+
+def test_get_device_vlans_matches_connect(server):
+    dot = Client.Connect('user', 'secret', server)
+    expected = dot.get_device_vlans('3')
+    assert len(expected['Device']['3']) > 1
+    assert run(server, 'get_device_vlans', '3') == expected
+    assert run(server, 'get_device_vlans', '3', workers=1) == expected
+
+def test_get_matches_connect(server):
+    dot = Client.Connect('user', 'secret', server)
+    assert run(server, 'get_object_by_id', 'rr', '7') == dot.get_object_by_id('rr', '7')
+    assert run(server, 'get_host_by_name', 'host9') == dot.get_host_by_name('host9')
+
+def test_coalesced_gets_share_one_result(server):
+    async def call():
+        async with AsyncConnect('user', 'secret', server, coalesce=True) as dot:
+            results = await asyncio.gather(*[dot.get('/vlan') for i in range(5)])
+            return results, dot.flights
+    results, flights = asyncio.run(call())
+    assert all(result is results[0] for result in results)
+    assert flights == {}
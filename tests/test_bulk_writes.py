@@ -0,0 +1,55 @@
+import requests
+from conftest import http_error
+
+def test_delete_many(hosts):
+    results, errors = hosts.delete_many('device', ['1', '2'], workers=2)
+    assert sorted(results) == ['1', '2']
+    assert errors == {}
+    assert sorted(hosts.writes) == [('DELETE', '/device/1', None),
+                                    ('DELETE', '/device/2', None)]
+
+def test_delete_many_hosts_by_rrid(hosts):
+    hosts.delete_many('host', ['7'])
+    assert hosts.writes == [('DELETE', '/host?rrid=7', None)]
+
+def test_delete_many_reports_errors(hosts):
+    hosts.errors['/device/2'] = 403
+    results, errors = hosts.delete_many('device', ['1', '2', '3'], workers=2)
+    assert sorted(results) == ['1', '3']
+    assert errors['2'].response.status_code == 403
+
+def test_update_many(hosts):
+    results, errors = hosts.update_many('host', {'7': {'name': 'seven'},
+                                                 '8': {'name': 'eight'}}, workers=2)
+    assert sorted(results) == ['7', '8']
+    assert sorted(hosts.writes) == [('POST', '/host?rrid=7', {'name': 'seven'}),
+                                    ('POST', '/host?rrid=8', {'name': 'eight'})]
+
+def test_dry_run_sends_nothing(hosts):
+    results, errors = hosts.update_many('device', {'12': {'info': 'spare'}}, dry_run=True)
+    assert results == {'12': ('POST', '/device/12', {'info': 'spare'})}
+    results, errors = hosts.delete_many('host', ['7'], dry_run=True)
+    assert results == {'7': ('DELETE', '/host?rrid=7', None)}
+    assert hosts.writes == []
+
+def test_update_many_retries_transient_errors(hosts):
+    failures = [http_error(503), requests.exceptions.ConnectionError()]
+    def before_write(method, url, data):
+        if failures:
+            raise failures.pop(0)
+    hosts.before_write = before_write
+    results, errors = hosts.update_many('device', {'12': {'info': 'spare'}})
+    assert errors == {} and list(results) == ['12']
+    assert len(hosts.writes) == 3
+
+def test_update_many_gives_up(hosts):
+    hosts.errors['/device/12'] = 503
+    results, errors = hosts.update_many('device', {'12': {'info': 'spare'}})
+    assert errors['12'].response.status_code == 503
+    assert len(hosts.writes) == 1 + hosts.retries
+
+def test_update_many_does_not_retry_client_errors(hosts):
+    hosts.errors['/device/12'] = 400
+    results, errors = hosts.update_many('device', {'12': {'info': 'spare'}})
+    assert errors['12'].response.status_code == 400
+    assert len(hosts.writes) == 1
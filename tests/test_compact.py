@@ -0,0 +1,44 @@
+import pytest
+from netdot import Util
+
+XML = (b'<opt>'
+       b'<Interface id="1" name="Gi1/0/1" device="12" oper_status="up" />'
+       b'<Interface id="2" name="Gi1/0/2" device="12" oper_status="down" />'
+       b'<Interface id="3" name="Gi1/0/3" device="12" oper_status="up" />'
+       b'</opt>')
+
+def test_compact_matches_dicts():
+    plain = Util.parse_xml(XML)
+    compact = Util.parse_xml(XML, compact=True)
+    assert isinstance(compact['Interface'], Util.Table)
+    assert compact == plain
+    assert dict((id, record.to_dict()) for id, record in compact['Interface'].items()) == \
+        plain['Interface']
+
+def test_record_access():
+    record = Util.parse_xml(XML, compact=True)['Interface']['2']
+    assert record['name'] == 'Gi1/0/2'
+    assert record.get('speed') is None
+    assert record.get('speed', 0) == 0
+    assert 'device' in record and 'speed' not in record
+    assert len(record) == 4
+    assert sorted(record) == ['device', 'id', 'name', 'oper_status']
+    assert dict(record.items()) == record.to_dict()
+    with pytest.raises(KeyError):
+        record['speed']
+
+def test_records_share_schema_and_values():
+    table = Util.parse_xml(XML, compact=True)['Interface']
+    one, three = table['1'], table['3']
+    assert one._fields is three._fields
+    assert one['device'] is three['device']
+    assert one['oper_status'] is three['oper_status']
+
+def test_single_object_is_not_compacted():
+    assert Util.parse_xml(b'<opt id="1" name="a" />', compact=True) == \
+        {'id': '1', 'name': 'a'}
+
+def test_connect_get_compact(hosts):
+    table = hosts.get('/rr', compact=True)['RR']
+    assert isinstance(table, Util.Table)
+    assert table['7']['name'] == 'host7'
@@ -0,0 +1,60 @@
+import time
+import threading
+import pytest
+import requests
+from conftest import http_error
+
+def hosts_in(subnets, count):
+    return [{'name': '%s-%d' % (subnet, i), 'subnet': subnet}
+            for subnet in subnets for i in range(count)]
+
+def test_create_hosts(hosts):
+    data = hosts_in(['10.0.1.0/24', '10.0.2.0/24'], 3) + \
+        [{'name': 'fixed', 'address': '10.0.3.7'}]
+    outcomes = list(hosts.create_hosts(data, workers=4))
+    assert sorted(outcome[0]['name'] for outcome in outcomes) == \
+        sorted(host['name'] for host in data)
+    assert all(result and error is None for host, result, error in outcomes)
+    assert all(write[:2] == ('POST', '/host') for write in hosts.writes)
+
+def test_same_subnet_is_serial_across_subnets_parallel(hosts):
+    lock = threading.Lock()
+    running = {}
+    overlaps = {'same': 0, 'any': 0}
+    def before_write(method, url, data):
+        subnet = data.get('subnet')
+        with lock:
+            if running.get(subnet):
+                overlaps['same'] += 1
+            if any(running.values()):
+                overlaps['any'] += 1
+            running[subnet] = running.get(subnet, 0) + 1
+        time.sleep(0.01)
+        with lock:
+            running[subnet] -= 1
+    hosts.before_write = before_write
+    list(hosts.create_hosts(hosts_in(['10.0.%d.0/24' % i for i in range(4)], 3),
+                            workers=4))
+    assert overlaps['same'] == 0
+    assert overlaps['any'] > 0
+
+def test_errors_are_reported(hosts):
+    def before_write(method, url, data):
+        if data['name'] == '10.0.1.0/24-1':
+            raise http_error(409)
+    hosts.before_write = before_write
+    outcomes = list(hosts.create_hosts(hosts_in(['10.0.1.0/24'], 3)))
+    errors = [(host['name'], error) for host, result, error in outcomes if error]
+    assert [name for name, error in errors] == ['10.0.1.0/24-1']
+    assert isinstance(errors[0][1], requests.exceptions.HTTPError)
+    assert len(outcomes) == 3
+
+def test_stop_on_error(hosts):
+    def before_write(method, url, data):
+        raise http_error(500)
+    hosts.before_write = before_write
+    outcomes = list(hosts.create_hosts(hosts_in(['10.0.1.0/24'], 5), stop_on_error=True))
+    assert len(outcomes) == 1
+
+def test_no_hosts(hosts):
+    assert list(hosts.create_hosts([])) == []
@@ -0,0 +1,70 @@
+import pytest
+import requests
+
+def test_bundle(topology):
+    bundle = topology.get_device_bundle('1')['Device']['1']
+    assert sorted(bundle['interfaces']) == ['1', '2', '3', '4']
+    iface = bundle['interfaces']['2']
+    assert iface['attrib']['name'] == 'Gi1/0/2'
+    assert list(iface['vlans']) == ['3']
+    assert iface['vlans']['3']['vid'] == '103'
+    assert list(iface['ips']) == ['2']
+    assert bundle['interfaces']['4']['vlans'] == {}
+    assert bundle['interfaces']['4']['ips'] == {}
+    assert sorted(bundle['vlans']) == ['1', '2', '3']
+
+@pytest.mark.parametrize('page_size', [1, 2, 1000])
+def test_bundle_matches_device_vlans(topology, page_size):
+    bundle = topology.get_device_bundle(['1', '2', '3'], include=['vlans'],
+                                        page_size=page_size)['Device']
+    for device in ('1', '2', '3'):
+        assert sorted(bundle[device]['vlans']) == \
+            sorted(topology.get_device_vlans(device)['Device'][device])
+
+def test_include(topology):
+    bundle = topology.get_device_bundle('1', include=['interfaces'])['Device']['1']
+    assert 'vlans' not in bundle
+    assert 'ips' not in bundle['interfaces']['1']
+    assert topology.get_device_bundle('1', include=[]) == \
+        {'Device': {'1': {'interfaces': {}}}}
+    assert not any(url.startswith('/interfacevlan') for url in topology.urls)
+
+def test_small_tables_are_walked(topology):
+    topology.get_device_bundle('1', include=['vlans'])
+    # One interface query, a probe and one page of InterfaceVlans,
+    # and the VLAN table
+    assert topology.urls == ['/interface?device=1',
+                             '/interfacevlan?limit=1&offset=2700',
+                             '/interfacevlan?limit=1000&offset=0',
+                             '/vlan']
+
+def test_large_tables_are_queried_per_key(topology):
+    topology.get_device_bundle('1', include=['vlans'], page_size=1)
+    per_key = [url for url in topology.urls if url.startswith('/interfacevlan?interface=')]
+    assert len(per_key) == 4
+    assert not any('limit=1&offset=0' in url for url in topology.urls)
+
+def test_fewer_requests_than_device_vlans(topology):
+    topology.get_device_vlans('1')
+    lookups = len(topology.urls)
+    del topology.urls[:]
+    topology.get_device_bundle('1', include=['vlans'], page_size=1)
+    assert len(topology.urls) <= lookups + 2
+    del topology.urls[:]
+    topology.get_device_bundle('1', include=['vlans'])
+    assert len(topology.urls) < lookups
+
+def test_paging_not_supported(topology):
+    topology.paging = False
+    bundle = topology.get_device_bundle('1', include=['vlans'])['Device']['1']
+    assert sorted(bundle['vlans']) == ['1', '2', '3']
+    assert not any('limit=1000' in url for url in topology.urls)
+
+def test_unknown_device(topology):
+    assert topology.get_device_bundle('99') == \
+        {'Device': {'99': {'interfaces': {}, 'vlans': {}}}}
+
+def test_errors_propagate(topology):
+    topology.errors['/vlan'] = 500
+    with pytest.raises(requests.exceptions.HTTPError):
+        topology.get_device_bundle('1', include=['vlans'])
@@ -0,0 +1,20 @@
+import threading
+
+def test_get_device_vlans(topology):
+    vlans = topology.get_device_vlans('1')
+    # Interfaces 1-3 are in VLANs 2, 3 and 1; interface 4 is an SVI
+    assert sorted(vlans['Device']['1']) == ['1', '2', '3']
+
+def test_get_device_vlans_serial(topology):
+    assert topology.get_device_vlans('2', workers=1) == topology.get_device_vlans('2')
+
+def test_get_device_vlans_is_concurrent(topology):
+    # Every interface lookup waits until all of them are in flight
+    started = threading.Barrier(4, timeout=5)
+    def before_get(url):
+        if url.startswith('/interfacevlan'):
+            started.wait()
+    topology.before_get = before_get
+    vlans = topology.get_device_vlans('1', workers=4)
+    assert not started.broken
+    assert sorted(vlans['Device']['1']) == ['1', '2', '3']
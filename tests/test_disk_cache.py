@@ -0,0 +1,67 @@
+import pytest
+from netdot import Client, Cache
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache.sqlite')
+
+def test_ttl_without_validators(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(Cache.time, 'time', lambda: now[0])
+    cache = Cache.DiskCache(path, ttl=10)
+    assert cache.get('/rr?id=1') is None
+    cache.set('/rr?id=1', b'<opt />')
+    entry = cache.get('/rr?id=1')
+    assert entry.fresh and entry.content == b'<opt />'
+    now[0] += 20
+    assert cache.get('/rr?id=1') is None
+
+def test_revalidation(path):
+    cache = Cache.DiskCache(path)
+    cache.set('/rr?id=1', b'<opt />', '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+    entry = cache.get('/rr?id=1')
+    assert not entry.fresh
+    assert cache.conditional_headers(entry) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    cache.touch('/rr?id=1')
+    assert cache.stats()['revalidated'] == 1
+
+def test_ttl_zero_disables(path):
+    cache = Cache.DiskCache(path, ttls={'host': 0})
+    cache.set('/host?name=a', b'<opt />')
+    assert cache.get('/host?name=a') is None
+    assert cache.stats()['size'] == 0
+
+def test_persists_across_instances(path):
+    cache = Cache.DiskCache(path)
+    cache.set('/vlan?id=1', b'<opt />', server='https://a/rest', username='alice')
+    cache.close()
+    cache = Cache.DiskCache(path)
+    assert cache.get('/vlan?id=1', 'https://a/rest', 'alice').content == b'<opt />'
+
+def test_keyed_by_server_and_username(path):
+    cache = Cache.DiskCache(path)
+    cache.set('/rr?id=1', b'a', server='https://a/rest', username='alice')
+    cache.set('/rr?id=1', b'b', server='https://b/rest', username='alice')
+    assert cache.get('/rr?id=1', 'https://a/rest', 'alice').content == b'a'
+    assert cache.get('/rr?id=1', 'https://b/rest', 'alice').content == b'b'
+    assert cache.get('/rr?id=1', 'https://a/rest', 'bob') is None
+    cache.invalidate('host', server='https://a/rest')
+    assert cache.get('/rr?id=1', 'https://a/rest', 'alice') is None
+    assert cache.get('/rr?id=1', 'https://b/rest', 'alice').content == b'b'
+
+def test_write_during_fetch_is_not_stored(path):
+    cache = Cache.DiskCache(path)
+    generation = cache.generation('/ipblock?id=1')
+    cache.invalidate('host')
+    cache.set('/ipblock?id=1', b'old', generation=generation)
+    assert cache.get('/ipblock?id=1') is None
+
+def test_connect_serves_from_disk(server, path):
+    cache = Cache.DiskCache(path)
+    dot = Client.Connect('user', 'secret', server, disk_cache=cache)
+    content = dot.get_xml('/vlan?id=1')
+    other = Client.Connect('user', 'secret', server, disk_cache=Cache.DiskCache(path))
+    assert other.get_xml('/vlan?id=1') == content
+    assert other.disk_cache.stats()['hits'] == 1
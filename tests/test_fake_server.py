@@ -0,0 +1,18 @@
+import pytest
+import requests
+from netdot import Client
+
+def test_page_past_the_end_is_404(server):
+    dot = Client.Connect('user', 'secret', server)
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        dot.get('/interface?limit=10&offset=480')
+    assert e.value.response.status_code == 404
+
+@pytest.mark.parametrize('page_size', [48, 100])
+def test_iter_objects_walks_to_the_404(server, page_size):
+    dot = Client.Connect('user', 'secret', server)
+    urls = []
+    dot.add_hook('pre', lambda event: urls.append(event['url']))
+    ids = [id for tag, id, attrib in dot.iter_objects('interface', page_size=page_size)]
+    assert ids == [str(i) for i in range(1, 481)]
+    assert len(urls) == len(set(urls))
@@ -0,0 +1,33 @@
+from netdot import Util
+
+DATA = {'Interface': {'1': {'id': '1', 'name': 'Gi1/0/1', 'description': 'uplink',
+                            'snmp_index': '1'}}}
+
+def test_filter_dict():
+    assert Util.filter_dict(DATA, ['name', 'snmp.*']) == \
+        {'Interface': {'1': {'name': 'Gi1/0/1', 'snmp_index': '1'}}}
+
+def test_filter_dict_matches_at_the_start():
+    assert Util.filter_dict(DATA, ['index']) == {'Interface': {'1': {}}}
+    assert Util.filter_dict(DATA, ['.*index']) == \
+        {'Interface': {'1': {'snmp_index': '1'}}}
+
+def test_filter_dict_without_keywords_copies():
+    filtered = Util.filter_dict(DATA, [])
+    assert filtered == DATA
+    assert filtered['Interface']['1'] is not DATA['Interface']['1']
+
+def test_projections_are_cached():
+    assert Util.projection(['name', 'id']) is Util.projection(['name', 'id'])
+    project = Util.projection(['na'])
+    assert project({'name': 'a', 'id': '1'}) == {'name': 'a'}
+    assert project._matches == {'name': True, 'id': False}
+
+def test_fields_are_dropped_while_parsing(hosts):
+    assert hosts.get('/rr?id=3', fields=['name']) == {'RR': {'3': {'name': 'host3'}}}
+    table = hosts.get('/rr?id=3', compact=True, fields=['name', 'zone'])['RR']
+    assert table['3'].to_dict() == {'name': 'host3', 'zone': 'example.com'}
+
+def test_single_object_fields():
+    assert Util.parse_xml(b'<opt id="1" name="a" info="b" />', fields=['name']) == \
+        {'name': 'a'}
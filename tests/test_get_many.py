@@ -0,0 +1,29 @@
+import threading
+
+def test_get_many(hosts):
+    data, errors = hosts.get_many('rr', ['1', '2', 3], workers=2)
+    assert sorted(data['RR']) == ['1', '2', '3']
+    assert errors == {}
+
+def test_get_many_reports_errors(hosts):
+    hosts.errors['/rr?id=2'] = 500
+    data, errors = hosts.get_many('rr', ['1', '2', '99'], workers=2)
+    assert sorted(data['RR']) == ['1']
+    assert sorted(errors) == ['2', '99']
+    assert errors['2'].response.status_code == 500
+    assert errors['99'].response.status_code == 404
+
+def test_get_many_slow_id_does_not_hold_others(hosts):
+    # While id 1 is outstanding, the other worker goes on with
+    # id 2, which a chunk of [1, 2] would have held up
+    fetched = threading.Event()
+    waited = []
+    def before_get(url):
+        if url == '/rr?id=1':
+            waited.append(fetched.wait(2))
+        elif url == '/rr?id=2':
+            fetched.set()
+    hosts.before_get = before_get
+    data, errors = hosts.get_many('rr', ['1', '2', '3', '4'], workers=2)
+    assert waited == [True]
+    assert sorted(data['RR']) == ['1', '2', '3', '4']
@@ -0,0 +1,82 @@
+import pytest
+from netdot import Ipam
+
+ROWS = [
+    ('1', '10.1.0.0', '16', '4'),
+    ('2', '10.1.2.0', '24', '4'),
+    ('3', '10.1.2.1', '32', '4'),
+    ('4', '10.1.2.2', '32', '4'),
+    ('5', '10.1.2.5', '32', '4'),
+    ('6', '10.1.0.0', '24', '4'),
+    ('7', '2001:db8::', '32', '6'),
+    ('8', '2001:db8::', '64', '6'),
+    ('9', '2001:db8::1', '128', '6'),
+]
+
+@pytest.fixture
+def ipam():
+    ipam = Ipam.Ipam()
+    ipam.load({'id': id, 'address': address, 'prefix': prefix, 'version': version}
+              for id, address, prefix, version in ROWS)
+    return ipam
+
+def ids(blocks):
+    return dict((key, block and block['id']) for key, block in blocks.items())
+
+def test_lookup(ipam):
+    assert ids(ipam.lookup(['10.1.2.1', '10.1.9.9', '2001:db8::1', '192.0.2.1'])) == {
+        '10.1.2.1': '2', '10.1.9.9': '1', '2001:db8::1': '8', '192.0.2.1': None}
+    assert ids(ipam.lookup('10.1.2.1', hosts=True)) == {'10.1.2.1': '3'}
+
+def test_cidr_and_block(ipam):
+    assert ipam.cidr('8') == '2001:db8::/64'
+    assert ipam.block('10.1.2.0/24')['id'] == '2'
+    assert ipam.block('10.1.3.0/24') is None
+
+def test_utilization(ipam):
+    usage = ipam.utilization(['10.1.0.0/16', '10.1.2.0/24', '2001:db8::/64'])
+    assert usage['10.1.0.0/16'] == {'total': 65536, 'used': 512, 'free': 65024,
+                                    'utilization': 512 / 65536.0}
+    assert usage['10.1.2.0/24']['used'] == 3
+    assert usage['2001:db8::/64']['used'] == 1
+    assert usage['2001:db8::/64']['free'] == 2 ** 64 - 1
+
+def test_utilization_split(ipam):
+    usage = ipam.utilization('10.1.0.0/16', prefixlen=24)
+    assert len(usage) == 256
+    assert usage['10.1.2.0/24']['used'] == 3
+    # A block with no children of its own is all free
+    assert usage['10.1.0.0/24']['used'] == 0
+    assert usage['10.1.255.0/24'] == {'total': 256, 'used': 0, 'free': 256,
+                                      'utilization': 0.0}
+
+def test_utilization_outside_blocks(ipam):
+    assert ipam.utilization('192.0.2.0/24')['192.0.2.0/24']['used'] == 0
+    assert ipam.utilization('10.0.0.0/8')['10.0.0.0/8']['used'] == 65536
+
+def test_next_free_addresses(ipam):
+    # The network address is skipped, as are used addresses
+    assert ipam.next_free('10.1.2.0/24', count=5) == [
+        '10.1.2.3', '10.1.2.4', '10.1.2.6', '10.1.2.7', '10.1.2.8']
+
+def test_next_free_skips_broadcast(ipam):
+    ipam.load([{'id': '1', 'address': '10.9.9.0', 'prefix': '30', 'version': '4'}])
+    assert ipam.next_free('10.9.9.0/30', count=10) == ['10.9.9.1', '10.9.9.2']
+
+def test_next_free_prefixes(ipam):
+    assert ipam.next_free('10.1.0.0/16', count=3, prefixlen=24) == [
+        '10.1.1.0/24', '10.1.3.0/24', '10.1.4.0/24']
+    assert ipam.next_free('10.1.0.0/16', prefixlen=23) == ['10.1.4.0/23']
+    assert ipam.next_free('10.1.2.0/24', prefixlen=16) == []
+
+def test_next_free_ipv6(ipam):
+    assert ipam.next_free('2001:db8::/32', count=2, prefixlen=64) == [
+        '2001:db8:0:1::/64', '2001:db8:0:2::/64']
+    assert ipam.next_free('2001:db8::/64', count=2) == ['2001:db8::', '2001:db8::2']
+
+def test_next_free_full(ipam):
+    ipam.load([{'id': '1', 'address': '10.9.9.0', 'prefix': '31', 'version': '4'},
+               {'id': '2', 'address': '10.9.9.0', 'prefix': '32', 'version': '4'},
+               {'id': '3', 'address': '10.9.9.1', 'prefix': '32', 'version': '4'}])
+    assert ipam.next_free('10.9.9.0/31') == []
+    assert ipam.utilization('10.9.9.0/31')['10.9.9.0/31']['free'] == 0
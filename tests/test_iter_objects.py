@@ -0,0 +1,58 @@
+import pytest
+import requests
+
+def ids(dot, **kwargs):
+    return [id for tag, id, attrib in dot.iter_objects('rr', **kwargs)]
+
+def test_iter_objects_no_match(hosts):
+    assert ids(hosts, name='nothing') == []
+
+def test_iter_objects_empty_table(hosts):
+    hosts.rows = []
+    assert ids(hosts) == []
+
+@pytest.mark.parametrize('page_size', [1, 5, 10, 30])
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_objects_exact_pages(hosts, page_size, prefetch):
+    # The page after the last one is empty: a 404
+    assert ids(hosts, page_size=page_size, prefetch=prefetch) == \
+        [str(i) for i in range(1, 31)]
+
+def test_iter_objects_filters(hosts):
+    hosts.rows[3]['zone'] = 'other'
+    assert ids(hosts, page_size=2, zone='other') == ['4']
+
+@pytest.mark.parametrize('deleted', [1, 3, 9])
+def test_iter_objects_delete_during_walk(hosts, deleted):
+    def delete(url):
+        if 'offset=0' not in url and len(hosts.rows) == 30:
+            del hosts.rows[2:2 + deleted]
+    hosts.before_get = delete
+    walked = ids(hosts, page_size=10, prefetch=False)
+    assert len(walked) == len(set(walked))
+    assert set(walked) >= set(str(i) for i in range(3 + deleted, 31))
+
+def test_iter_objects_insert_during_walk(hosts):
+    def insert(url):
+        if 'offset=0' not in url and len(hosts.rows) == 30:
+            hosts.rows[0:0] = [{'id': 'new%d' % i, 'name': 'new'} for i in range(4)]
+    hosts.before_get = insert
+    walked = ids(hosts, page_size=10, prefetch=False)
+    assert len(walked) == len(set(walked))
+    assert set(walked) >= set(str(i) for i in range(1, 31))
+
+def test_iter_objects_errors_propagate(hosts):
+    hosts.errors['/rr?limit=10&offset=0'] = 500
+    with pytest.raises(requests.exceptions.HTTPError):
+        ids(hosts, page_size=10)
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_objects_paging_ignored(hosts, prefetch):
+    hosts.paging = False
+    assert ids(hosts, page_size=10, prefetch=prefetch) == [str(i) for i in range(1, 31)]
+    assert hosts.urls == ['/rr?limit=10&offset=0']
+
+def test_iter_objects_paging_ignored_small_table(hosts):
+    hosts.paging = False
+    assert ids(hosts, page_size=30) == [str(i) for i in range(1, 31)]
+    assert len(hosts.urls) == 2
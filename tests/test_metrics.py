@@ -0,0 +1,56 @@
+import pytest
+import requests
+from netdot import Client, Metrics
+
+@pytest.mark.parametrize('url, template', [
+    ('/host?name=foo', '/host?name={}'),
+    ('/device/12', '/device/{id}'),
+    ('/interface?device=12&name=Gi1', '/interface?device={}&name={}'),
+    ('/vlan', '/vlan'),
+])
+def test_url_template(url, template):
+    assert Metrics.url_template(url) == template
+
+def test_histogram():
+    h = Metrics.Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value)
+    assert h.count == 4
+    assert h.sum == pytest.approx(3.65)
+    assert h.cumulative() == [(0.1, 2), (1.0, 3), ('+Inf', 4)]
+
+def test_hooks(server):
+    dot = Client.Connect('user', 'secret', server)
+    events = []
+    for hook in ('pre', 'post', 'parse'):
+        dot.add_hook(hook, events.append)
+    dot.get('/rr?id=3')
+    assert [event['hook'] for event in events] == ['pre', 'post', 'parse']
+    pre, post, parse = events
+    assert pre['method'] == 'GET' and pre['url'] == '/rr?id=3'
+    assert pre['template'] == '/rr?id={}'
+    assert post['status'] == 200 and post['bytes'] > 0 and post['error'] is None
+    assert post['network_time'] >= 0 and parse['parse_time'] >= 0
+
+def test_failed_request_event(server):
+    dot = Client.Connect('user', 'secret', server)
+    events = []
+    dot.add_hook('post', events.append)
+    with pytest.raises(requests.exceptions.HTTPError):
+        dot.get('/rr?id=999999')
+    assert events[0]['status'] == 404
+
+def test_metrics(server):
+    dot = Client.Connect('user', 'secret', server)
+    metrics = Metrics.Metrics()
+    metrics.install(dot)
+    for id in ('1', '2'):
+        dot.get('/rr?id=' + id)
+    summary = metrics.summary()
+    assert summary['/rr?id={}']['requests'] == 2
+    assert summary['/rr?id={}']['bytes'] > 0
+    assert summary['/rr?id={}']['parse_time'] >= 0
+    text = metrics.prometheus()
+    assert 'netdot_client_requests_total{endpoint="/rr?id={}",method="GET",status="200"} 2' in text
+    assert 'netdot_client_network_seconds_count{endpoint="/rr?id={}",method="GET"} 2' in text
+    assert 'netdot_client_parse_seconds_bucket{endpoint="/rr?id={}",le="+Inf"} 2' in text
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import pytest
+from netdot import Util
+
+BACKENDS = ['etree', 'expat']
+if Util._import_lxml():
+    BACKENDS.append('lxml')
+
+LIST = (u'<opt>'
+        u'<Interface id="1" name="Gi1/0/1" description="café" />'
+        u'<Interface id="2" name="Gi1/0/2" description="" />'
+        u'<!-- comment -->'
+        u'<Device id="12" name="switch" />'
+        u'</opt>').encode('utf-8')
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = Util.PARSER
+    Util.set_parser(request.param)
+    yield request.param
+    Util.PARSER = previous
+
+def test_list(backend):
+    assert Util.parse_xml(LIST) == {
+        'Interface': {'1': {'id': '1', 'name': 'Gi1/0/1', 'description': u'café'},
+                      '2': {'id': '2', 'name': 'Gi1/0/2', 'description': ''}},
+        'Device': {'12': {'id': '12', 'name': 'switch'}}}
+
+def test_single_object(backend):
+    assert Util.parse_xml(b'<opt id="7" name="a" />') == {'id': '7', 'name': 'a'}
+
+def test_empty(backend):
+    assert Util.parse_xml(b'<opt></opt>') == {}
+
+def test_backends_agree(backend):
+    compact = Util.parse_xml(LIST, compact=True)
+    assert isinstance(compact['Interface'], Util.Table)
+    assert compact == Util.parse_xml(LIST)
+    assert Util.parse_xml(LIST, fields=['name']) == {
+        'Interface': {'1': {'name': 'Gi1/0/1'}, '2': {'name': 'Gi1/0/2'}},
+        'Device': {'12': {'name': 'switch'}}}
+
+@pytest.mark.parametrize('xml', [b'<html><body /></html>', b'<opt><RR id="1"', b'not xml'])
+def test_errors(backend, xml):
+    with pytest.raises(Util.NetdotError):
+        Util.parse_xml(xml)
+
+def test_unknown_parser():
+    with pytest.raises(ValueError):
+        Util.set_parser('sax')
@@ -0,0 +1,87 @@
+import pytest
+from netdot import Prefix
+
+@pytest.fixture
+def index():
+    index = Prefix.PrefixIndex()
+    index.add('0.0.0.0', 0, 'default4')
+    index.add('10.0.0.0', 8, 'ten')
+    index.add('10.1.0.0', 16, 'ten-one')
+    index.add('10.1.2.0', 24, 'subnet')
+    index.add('10.1.2.3', 32, 'host')
+    index.add('::', 0, 'default6')
+    index.add('2001:db8::', 32, 'doc')
+    index.add('2001:db8:0:1::', 64, 'lan')
+    index.add('2001:db8:0:1::1', 128, 'host6')
+    return index
+
+def values(matches):
+    return [value for network, prefixlen, value in matches]
+
+def test_covering_ipv4(index):
+    assert list(index.covering('10.1.2.3')) == [
+        ('10.1.2.3', 32, 'host'), ('10.1.2.0', 24, 'subnet'),
+        ('10.1.0.0', 16, 'ten-one'), ('10.0.0.0', 8, 'ten'),
+        ('0.0.0.0', 0, 'default4')]
+
+@pytest.mark.parametrize('address,expected', [
+    ('10.1.2.0', ['subnet', 'ten-one', 'ten', 'default4']),
+    ('10.1.2.255', ['subnet', 'ten-one', 'ten', 'default4']),
+    ('10.1.3.0', ['ten-one', 'ten', 'default4']),
+    ('10.1.1.255', ['ten-one', 'ten', 'default4']),
+    ('10.255.255.255', ['ten', 'default4']),
+    ('11.0.0.0', ['default4']),
+    ('9.255.255.255', ['default4']),
+    ('255.255.255.255', ['default4']),
+])
+def test_covering_ipv4_boundaries(index, address, expected):
+    assert values(index.covering(address)) == expected
+
+@pytest.mark.parametrize('address,expected', [
+    ('2001:db8:0:1::1', ['host6', 'lan', 'doc', 'default6']),
+    ('2001:db8:0:1::', ['lan', 'doc', 'default6']),
+    ('2001:db8:0:1:ffff:ffff:ffff:ffff', ['lan', 'doc', 'default6']),
+    ('2001:db8:0:2::', ['doc', 'default6']),
+    ('2001:db8:ffff:ffff:ffff:ffff:ffff:ffff', ['doc', 'default6']),
+    ('2001:db9::', ['default6']),
+    ('2001:db7:ffff:ffff:ffff:ffff:ffff:ffff', ['default6']),
+    ('ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff', ['default6']),
+])
+def test_covering_ipv6_boundaries(index, address, expected):
+    assert values(index.covering(address)) == expected
+
+def test_versions_are_separate(index):
+    # ::a01:203 has the integer value of 10.1.2.3
+    assert values(index.covering('::a01:203')) == ['default6']
+    assert values(index.covering(167838211, version=4))[0] == 'host'
+
+def test_lookup(index):
+    assert index.lookup('10.1.2.200') == ('10.1.2.0', 24, 'subnet')
+    assert index.lookup('2001:db8:0:1::2') == ('2001:db8:0:1::', 64, 'lan')
+    assert Prefix.PrefixIndex().lookup('10.1.2.3') is None
+
+def test_within_ipv4(index):
+    assert sorted(values(index.within('10.1.0.0', 16))) == ['host', 'subnet', 'ten-one']
+    assert sorted(values(index.within('10.1.2.0', 24))) == ['host', 'subnet']
+    assert list(index.within('10.1.3.0', 24)) == []
+    assert len(list(index.within('0.0.0.0', 0))) == 5
+
+def test_within_ipv6(index):
+    assert sorted(values(index.within('2001:db8::', 32))) == ['doc', 'host6', 'lan']
+    assert sorted(values(index.within('2001:db8:0:1::', 64))) == ['host6', 'lan']
+    assert list(index.within('2001:db8:0:2::', 64)) == []
+
+def test_host_bits_are_cleared(index):
+    index.add('10.1.2.77', 24, 'replaced')
+    assert index.get('10.1.2.0', 24) == 'replaced'
+    assert index.get('10.1.2.200', 24) == 'replaced'
+
+def test_remove(index):
+    index.remove('10.1.2.0', 24)
+    assert values(index.covering('10.1.2.9')) == ['ten-one', 'ten', 'default4']
+    assert len(index) == 8
+
+def test_parse_prefix():
+    assert Prefix.parse_prefix('192.168.1.77/24') == (4, 3232235776, 24)
+    assert Prefix.parse_prefix('2001:db8::1') == (6, 0x20010db8000000000000000000000001, 128)
+    assert Prefix.format_address(6, 0x20010db8000000000000000000000001) == '2001:db8::1'
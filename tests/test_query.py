@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import pytest
+from netdot import Util
+
+@pytest.mark.parametrize('filters, url', [
+    (None, '/interface'),
+    ({'device': 12, 'name': 'Gi1/0/1'}, '/interface?device=12&name=Gi1%2F0%2F1'),
+    ({'name': 'a b&c=d'}, '/interface?name=a+b%26c%3Dd'),
+    ({'description': u'café'}, '/interface?description=caf%C3%A9'),
+    ({'name': b'raw'}, '/interface?name=raw'),
+])
+def test_query_url(filters, url):
+    assert Util.query_url('interface', filters) == url
+
+def test_query_url_is_canonical():
+    assert Util.query_url('rr', {'zone': 'example.com', 'name': 'a'}) == \
+        Util.query_url('rr', {'name': 'a', 'zone': 'example.com'})
+
+def test_query(hosts):
+    hosts.rows.append({'id': '31', 'name': 'host3', 'zone': 'example.org'})
+    data = hosts.query('rr', {'name': 'host3'}, zone='example.org', fields=['zone'])
+    assert data == {'RR': {'31': {'zone': 'example.org'}}}
+    assert hosts.urls == ['/rr?name=host3&zone=example.org']
+
+def test_lookup_helpers_encode_values(hosts):
+    hosts.rows.append({'id': '31', 'name': 'a&b', 'zone': 'example.com'})
+    assert list(hosts.get_object_by_name('rr', 'a&b')['RR']) == ['31']
+    assert list(hosts.get_object_by_filter('rr', 'zone', 'example.com')['RR']) == \
+        [str(i) for i in range(1, 32)]
+    assert hosts.urls[0] == '/rr?name=a%26b'
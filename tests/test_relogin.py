@@ -0,0 +1,53 @@
+import threading
+import pytest
+from netdot import Client
+
+def connect(server, **kwargs):
+    return Client.Connect('user', 'secret', server.url, **kwargs)
+
+def test_invalid_credentials(auth_server):
+    with pytest.raises(AttributeError):
+        Client.Connect('user', 'wrong', auth_server.url)
+
+def test_expired_session_logs_in_again(auth_server):
+    dot = connect(auth_server)
+    dot.get_xml('/vlan')
+    auth_server.expire()
+    assert dot.get_xml('/vlan') == b'<opt></opt>'
+    assert auth_server.logins == 2
+    assert auth_server.refused == 1
+
+def test_redirect_to_login_page_is_expiry(auth_server):
+    auth_server.redirect = True
+    dot = connect(auth_server)
+    auth_server.expire()
+    assert dot.get_xml('/vlan') == b'<opt></opt>'
+    assert auth_server.logins == 2
+
+def test_post_is_replayed(auth_server):
+    dot = connect(auth_server)
+    auth_server.expire()
+    dot.create_object('vlan', {'vid': '10'})
+    assert auth_server.served == 1
+
+def test_one_login_for_concurrent_threads(auth_server):
+    dot = connect(auth_server)
+    auth_server.expire()
+    start = threading.Barrier(8, timeout=5)
+    def worker():
+        start.wait()
+        dot.get_xml('/vlan')
+    threads = [threading.Thread(target=worker) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert auth_server.served == 8
+    assert auth_server.logins == 2
+
+def test_wrong_password_after_expiry(auth_server):
+    dot = connect(auth_server)
+    dot._password = 'changed'
+    auth_server.expire()
+    with pytest.raises(AttributeError):
+        dot.get_xml('/vlan')
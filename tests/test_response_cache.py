@@ -0,0 +1,81 @@
+import pytest
+from netdot import Client, Cache
+
+def test_get_set():
+    cache = Cache.ResponseCache()
+    assert cache.get('/rr?id=1') is None
+    cache.set('/rr?id=1', b'<opt />')
+    assert cache.get('/rr?id=1') == b'<opt />'
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+def test_lru_eviction():
+    cache = Cache.ResponseCache(maxsize=2)
+    cache.set('/rr/1', b'1')
+    cache.set('/rr/2', b'2')
+    cache.get('/rr/1')
+    cache.set('/rr/3', b'3')
+    assert cache.get('/rr/2') is None
+    assert cache.get('/rr/1') == b'1'
+    assert cache.get('/rr/3') == b'3'
+
+def test_ttls(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(Cache.time, 'time', lambda: now[0])
+    cache = Cache.ResponseCache(ttl=10, ttls={'vlan': 100, 'host': 0})
+    cache.set('/rr/1', b'rr')
+    cache.set('/vlan/1', b'vlan')
+    cache.set('/host?name=a', b'host')
+    assert cache.get('/host?name=a') is None
+    now[0] += 50
+    assert cache.get('/rr/1') is None
+    assert cache.get('/vlan/1') == b'vlan'
+
+def test_invalidate_related_types():
+    cache = Cache.ResponseCache()
+    for url in ('/host?name=a', '/rr/1', '/ipblock/1', '/vlan/1'):
+        cache.set(url, b'x')
+    cache.invalidate('rr')
+    assert cache.get('/host?name=a') is None
+    assert cache.get('/rr/1') is None
+    assert cache.get('/ipblock/1') == b'x'
+    assert cache.get('/vlan/1') == b'x'
+    cache.invalidate()
+    assert cache.stats()['size'] == 0
+
+def test_write_during_fetch_is_not_stored():
+    cache = Cache.ResponseCache()
+    generation = cache.generation('/host?name=a')
+    cache.invalidate('rr')
+    cache.set('/host?name=a', b'old', generation=generation)
+    assert cache.get('/host?name=a') is None
+    cache.set('/host?name=a', b'new', generation=cache.generation('/host?name=a'))
+    assert cache.get('/host?name=a') == b'new'
+
+def test_keyed_by_server_and_username():
+    cache = Cache.ResponseCache()
+    cache.set('/rr/1', b'a', 'https://a/rest', 'alice')
+    cache.set('/rr/1', b'b', 'https://b/rest', 'alice')
+    assert cache.get('/rr/1', 'https://a/rest', 'alice') == b'a'
+    assert cache.get('/rr/1', 'https://b/rest', 'alice') == b'b'
+    assert cache.get('/rr/1', 'https://a/rest', 'bob') is None
+    cache.invalidate('rr', server='https://a/rest')
+    assert cache.get('/rr/1', 'https://a/rest', 'alice') is None
+    assert cache.get('/rr/1', 'https://b/rest', 'alice') == b'b'
+
+def test_connects_sharing_a_cache(server):
+    cache = Cache.ResponseCache()
+    alice = Client.Connect('alice', 'secret', server, cache=cache)
+    bob = Client.Connect('bob', 'secret', server, cache=cache)
+    assert alice.get('/rr?id=1') == bob.get('/rr?id=1')
+    assert cache.stats() == {'hits': 0, 'misses': 2, 'size': 2}
+    alice.get('/rr?id=1')
+    assert cache.stats()['hits'] == 1
+
+def test_connect_write_invalidates(server):
+    cache = Cache.ResponseCache()
+    dot = Client.Connect('user', 'secret', server, cache=cache)
+    dot.get('/rr?name=host1')
+    dot.get('/vlan?id=1')
+    dot.create_host({'name': 'new', 'subnet': '10.0.0.0/24'})
+    assert cache.stats()['size'] == 1
+    assert cache.get('/vlan?id=1', dot.base_url, 'user') is not None
@@ -0,0 +1,62 @@
+import time
+import pytest
+import requests
+from netdot import Client, SessionStore
+
+@pytest.fixture(params=['file', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'file':
+        if SessionStore.fcntl is None:
+            pytest.skip('fcntl is not available')
+        return SessionStore.FileSessionStore(str(tmp_path / 'session.json'))
+    return SessionStore.SqliteSessionStore(str(tmp_path / 'session.sqlite'))
+
+COOKIES = [{'name': 'netdot_auth', 'value': 'abc', 'domain': 'netdot.example.com',
+            'path': '/', 'expires': None, 'secure': True}]
+
+def test_save_load_clear(store):
+    assert store.load('a') is None
+    store.save('a', COOKIES)
+    store.save('b', [])
+    assert store.load('a') == COOKIES
+    assert store.load('b') == []
+    store.clear('a')
+    assert store.load('a') is None
+    assert store.load('b') == []
+
+def test_lock_is_reentrant(store):
+    with store.lock():
+        with store.lock():
+            store.save('a', COOKIES)
+    assert store.load('a') == COOKIES
+
+def test_cookie_round_trip():
+    jar = requests.cookies.RequestsCookieJar()
+    SessionStore.load_cookies(jar, COOKIES)
+    assert SessionStore.dump_cookies(jar) == COOKIES
+
+def test_expired():
+    assert not SessionStore.expired(COOKIES)
+    assert SessionStore.expired([dict(COOKIES[0], expires=int(time.time()) - 10)])
+    assert not SessionStore.expired([dict(COOKIES[0], expires=int(time.time()) + 60)])
+
+def test_file_store_needs_fcntl(monkeypatch, tmp_path):
+    monkeypatch.setattr(SessionStore, 'fcntl', None)
+    with pytest.raises(RuntimeError):
+        SessionStore.FileSessionStore(str(tmp_path / 'session.json'))
+
+def test_connects_share_a_login(auth_server, store):
+    first = Client.Connect('user', 'secret', auth_server.url, session_store=store)
+    second = Client.Connect('user', 'secret', auth_server.url, session_store=store)
+    second.get_xml('/vlan')
+    assert auth_server.logins == 1
+
+def test_expired_stored_session_is_replaced(auth_server, store):
+    first = Client.Connect('user', 'secret', auth_server.url, session_store=store)
+    auth_server.expire()
+    second = Client.Connect('user', 'secret', auth_server.url, session_store=store)
+    # The stored session is refused; one login replaces it for both
+    second.get_xml('/vlan')
+    first.get_xml('/vlan')
+    assert auth_server.logins == 2
+    assert auth_server.served == 2
@@ -0,0 +1,58 @@
+import time
+import threading
+import pytest
+from netdot import Cache
+
+def run_threads(count, target):
+    results = [None] * count
+    start = threading.Barrier(count, timeout=5)
+    def run(i):
+        start.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_calls_share_one_result():
+    flights = Cache.SingleFlight()
+    calls = []
+    def fetch(url):
+        calls.append(url)
+        time.sleep(0.2)
+        return {'url': url}
+    results = run_threads(5, lambda: flights.do('/vlan', fetch, '/vlan'))
+    assert calls == ['/vlan']
+    assert all(result is results[0] for result in results)
+    assert flights._calls == {}
+
+def test_errors_are_shared():
+    flights = Cache.SingleFlight()
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('boom')
+    results = run_threads(3, lambda: flights.do('key', fail))
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(set(id(result) for result in results)) == 1
+
+def test_sequential_calls_are_repeated():
+    flights = Cache.SingleFlight()
+    calls = []
+    for i in range(2):
+        flights.do('key', calls.append, i)
+    assert calls == [0, 1]
+
+def test_connect_coalesces_gets(hosts):
+    hosts.flights = Cache.SingleFlight()
+    hosts.before_get = lambda url: time.sleep(0.2)
+    results = run_threads(5, lambda: hosts.get('/rr?name=host3'))
+    assert hosts.urls == ['/rr?name=host3']
+    assert all(result is results[0] for result in results)
+    # Differently parsed results are separate flights
+    hosts.get('/rr?name=host3', compact=True)
+    assert len(hosts.urls) == 2
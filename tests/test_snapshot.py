@@ -0,0 +1,64 @@
+import pytest
+from netdot import Snapshot
+from conftest import FakeConnect
+
+@pytest.fixture
+def snap(hosts):
+    snap = Snapshot.Snapshot(hosts, objects=['RR'], page_size=7)
+    snap.refresh()
+    return snap
+
+def test_refresh(snap):
+    assert len(snap.tables['RR']) == 30
+    assert snap.get_rr_by_name('host11')['RR']['11']['zone'] == 'example.com'
+
+@pytest.fixture
+def network():
+    blocks = [
+        {'id': '1', 'address': '10.0.0.0', 'prefix': '16', 'version': '4',
+         'status': 'Container'},
+        {'id': '2', 'address': '10.0.1.0', 'prefix': '24', 'version': '4',
+         'status': 'Subnet', 'parent': '10.0.0.0/16', 'parent_xlink': 'Ipblock/1'},
+        {'id': '3', 'address': '10.0.1.5', 'prefix': '32', 'version': '4',
+         'status': 'Static', 'parent': '10.0.1.0/24', 'parent_xlink': 'Ipblock/2'},
+        {'id': '4', 'address': '10.0.1.6', 'prefix': '32', 'version': '4',
+         'status': 'Static', 'parent': '10.0.1.0/24', 'parent_xlink': 'Ipblock/2'},
+    ]
+    rrs = [{'id': '1', 'name': 'www', 'zone': 'example.com', 'zone_xlink': 'Zone/9'}]
+    dot = FakeConnect('RR', rrs, {'ipblock': ('Ipblock', blocks)})
+    snap = Snapshot.Snapshot(dot, objects=['RR', 'Ipblock'])
+    snap.refresh()
+    return snap
+
+def test_get_object_lookups(network):
+    assert list(network.get_object_by_id('ipblock', '3')['Ipblock']) == ['3']
+    assert list(network.get_object_by_name('RR', 'www')['RR']) == ['1']
+    assert network.get_object_by_id('ipblock', '99') == {}
+
+def test_foreign_keys_match_label_and_id(network):
+    assert list(network.get_object_by_filter('rr', 'zone', 'example.com')['RR']) == ['1']
+    assert list(network.get_object_by_filter('rr', 'zone', '9')['RR']) == ['1']
+
+def test_unindexed_field_scans(network):
+    assert sorted(network.get_object_by_filter('ipblock', 'prefix', '32')['Ipblock']) == \
+        ['3', '4']
+
+def test_get_rr_by_name(network):
+    assert network.get_rr_by_name('www')['RR']['1']['zone'] == 'example.com'
+
+def test_get_ipblock_by_address(network):
+    assert list(network.get_ipblock_by_address('10.0.1.6')['Ipblock']) == ['4']
+
+def test_get_ipblock_children(network):
+    assert sorted(network.get_ipblock_children('10.0.1.0/24')['Ipblock']) == ['3', '4']
+    assert list(network.get_ipblock_children('10.0.0.0/16')['Ipblock']) == ['2']
+    assert network.get_ipblock_children('10.9.0.0/16') == {}
+
+def test_get_block_by_address(network):
+    assert list(network.get_block_by_address('10.0.1.5')['Ipblock']) == ['2']
+    assert list(network.get_block_by_address('10.0.2.1')['Ipblock']) == ['1']
+    assert network.get_block_by_address('192.168.0.1') == {}
+
+def test_not_loaded(network):
+    with pytest.raises(KeyError):
+        network.get_object_by_id('device', '1')
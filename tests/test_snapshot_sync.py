@@ -0,0 +1,75 @@
+import pytest
+from netdot import Snapshot
+
+@pytest.fixture
+def snap(hosts):
+    snap = Snapshot.Snapshot(hosts, objects=['RR'], page_size=7)
+    snap.refresh()
+    return snap
+
+def names(snap):
+    return sorted(record['name'] for record in snap.tables['RR'].values())
+
+def test_sync_deletes_removed_rows(snap, hosts):
+    del hosts.rows[2]
+    assert snap.sync() == {'RR': {'added': 0, 'changed': 0, 'deleted': 1}}
+    assert snap.get_rr_by_name('host3') == {}
+    assert len(snap.tables['RR']) == 29
+
+def test_sync_changes_and_additions(snap, hosts):
+    hosts.rows[4] = dict(hosts.rows[4], name='renamed')
+    hosts.rows.append({'id': '31', 'name': 'host31', 'zone': 'example.com'})
+    assert snap.sync() == {'RR': {'added': 1, 'changed': 1, 'deleted': 0}}
+    assert snap.get_rr_by_name('host5') == {}
+    assert list(snap.get_rr_by_name('renamed')['RR']) == ['5']
+    assert list(snap.get_rr_by_name('host31')['RR']) == ['31']
+
+def test_sync_keeps_rows_missed_by_the_walk(snap, hosts):
+    # A walk racing with writes may not return every live row
+    walk = hosts.iter_objects
+    hosts.iter_objects = lambda object, **kwargs: (
+        item for item in walk(object, **kwargs) if item[1] != '11')
+    assert snap.sync()['RR']['deleted'] == 0
+    assert list(snap.get_rr_by_name('host11')['RR']) == ['11']
+
+def test_sync_deletion_during_walk(snap, hosts):
+    def delete(url):
+        if 'offset=0' not in url and 'limit' in url and len(hosts.rows) == 30:
+            del hosts.rows[2]
+    hosts.before_get = delete
+    # host3 was deleted after the walk passed it; the rows after
+    # it shift back a place, and none of them is lost
+    assert snap.sync()['RR']['deleted'] == 0
+    assert len(snap.tables['RR']) == 30
+    hosts.before_get = None
+    assert snap.sync()['RR']['deleted'] == 1
+    assert names(snap) == sorted('host%d' % i for i in range(1, 31) if i != 3)
+
+def test_sync_keeps_rows_on_lookup_errors(snap, hosts):
+    del hosts.rows[2]
+    hosts.errors['/rr?id=3'] = 500
+    assert snap.sync()['RR']['deleted'] == 0
+    assert list(snap.get_rr_by_name('host3')['RR']) == ['3']
+
+def test_sync_prunes_value_pool(snap, hosts):
+    for generation in range(4):
+        for row in hosts.rows:
+            row['name'] = 'gen%d-%s' % (generation, row['id'])
+        snap.sync()
+    # ids, names and the shared zone
+    assert len(snap.tables['RR']._values) == 30 + 30 + 1
+
+def test_sync_unchanged_timestamps_skip_comparison(hosts):
+    for row in hosts.rows:
+        row['modified'] = '2024-01-01 00:00:00'
+    snap = Snapshot.Snapshot(hosts, objects=['RR'], page_size=7)
+    snap.refresh()
+    # A field changed without the timestamp is not looked at
+    hosts.rows[0]['name'] = 'unseen'
+    hosts.rows[1]['name'] = 'renamed'
+    hosts.rows[1]['modified'] = '2024-01-02 00:00:00'
+    assert snap.sync() == {'RR': {'added': 0, 'changed': 1, 'deleted': 0}}
+    assert list(snap.get_rr_by_name('renamed')['RR']) == ['2']
+    assert list(snap.get_rr_by_name('host1')['RR']) == ['1']
+    assert snap.marks['RR'] == {'timestamp': 'modified',
+                                'modified': '2024-01-02 00:00:00'}
@@ -0,0 +1,35 @@
+from io import BytesIO
+import pytest
+from netdot import Client, Util
+
+def test_get_stream_matches_get(server):
+    dot = Client.Connect('user', 'secret', server)
+    rows = dict((id, dict(attrib)) for tag, id, attrib in
+                dot.get('/interface?device=2', stream=True))
+    assert rows == dot.get('/interface?device=2')['Interface']
+    assert len(rows) == 48
+
+def test_get_stream_fake(hosts):
+    assert [id for tag, id, attrib in hosts.get('/rr?zone=example.com', stream=True)] == \
+        [str(i) for i in range(1, 31)]
+
+def test_iter_xml_list():
+    xml = b'<opt><RR id="1" name="a" /><RR id="2" name="b" /></opt>'
+    assert [(tag, id, dict(attrib)) for tag, id, attrib in Util.iter_xml(BytesIO(xml))] == \
+        [('RR', '1', {'id': '1', 'name': 'a'}), ('RR', '2', {'id': '2', 'name': 'b'})]
+
+def test_iter_xml_single_object():
+    xml = b'<opt id="7" name="a" />'
+    assert list(Util.iter_xml(BytesIO(xml))) == [('opt', '7', {'id': '7', 'name': 'a'})]
+
+def test_iter_xml_closes_source():
+    source = BytesIO(b'<opt><RR id="1" /><RR id="2" /></opt>')
+    rows = Util.iter_xml(source)
+    next(rows)
+    rows.close()
+    assert source.closed
+
+@pytest.mark.parametrize('xml', [b'<html></html>', b'<opt><RR id="1"'])
+def test_iter_xml_errors(xml):
+    with pytest.raises(Util.NetdotError):
+        list(Util.iter_xml(BytesIO(xml)))
@@ -0,0 +1,43 @@
+import threading
+from netdot import Client
+
+def in_threads(count, target):
+    results = [None] * count
+    start = threading.Barrier(count, timeout=5)
+    def run(i):
+        start.wait()
+        results[i] = target()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_each_thread_has_its_own_session(auth_server):
+    dot = Client.Connect('user', 'secret', auth_server.url, thread_sessions=True)
+    def session():
+        dot.get_xml('/vlan')
+        return dot._session()
+    sessions = in_threads(4, session)
+    assert len(set(id(session) for session in sessions)) == 4
+    assert all(session is not dot.http for session in sessions)
+    assert dot._session() is not dot.http
+    assert auth_server.logins == 1 and auth_server.served == 4
+
+def test_sessions_share_the_connection_pools(auth_server):
+    dot = Client.Connect('user', 'secret', auth_server.url, thread_sessions=True)
+    adapters = in_threads(2, lambda: dot._session().get_adapter(auth_server.url))
+    assert all(adapter is dot._adapter for adapter in adapters)
+
+def test_one_login_when_the_session_expires(auth_server):
+    dot = Client.Connect('user', 'secret', auth_server.url, thread_sessions=True)
+    in_threads(8, lambda: dot.get_xml('/vlan'))
+    auth_server.expire()
+    in_threads(8, lambda: dot.get_xml('/vlan'))
+    assert auth_server.logins == 2
+    assert auth_server.served == 16
+
+def test_without_thread_sessions_the_session_is_shared(auth_server):
+    dot = Client.Connect('user', 'secret', auth_server.url)
+    assert all(session is dot.http for session in in_threads(2, dot._session))
@@ -0,0 +1,111 @@
+import time
+import threading
+import pytest
+import requests
+from netdot import Client
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+class Handler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def log_message(self, *args):
+      pass
+
+  def reply(self, status, body=b'<opt></opt>'):
+      self.send_response(status)
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+  def do_POST(self):
+      self.rfile.read(int(self.headers.get('Content-Length') or 0))
+      if self.path.endswith('/NetdotLogin'):
+          return self.reply(200, b'ok')
+      self.handle_rest()
+
+  def do_GET(self):
+      self.handle_rest()
+
+  def handle_rest(self):
+      server = self.server
+      server.requests.append((self.command, self.path))
+      time.sleep(server.delay)
+      if server.failures:
+          server.failures -= 1
+          return self.reply(503)
+      self.reply(200)
+
+class Server(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+  def handle_error(self, request, client_address):
+      # Clients that timed out have gone away
+      pass
+
+@pytest.fixture
+def flaky():
+    server = Server(('127.0.0.1', 0), Handler)
+    server.requests = []
+    server.failures = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def connect(server, **kwargs):
+    kwargs.setdefault('backoff', 0)
+    return Client.Connect('user', 'secret',
+                          'http://127.0.0.1:%d/netdot' % server.server_address[1],
+                          **kwargs)
+
+def test_get_is_retried(flaky):
+    dot = connect(flaky, retries=3)
+    flaky.failures = 2
+    assert dot.get_xml('/vlan') == b'<opt></opt>'
+    assert len(flaky.requests) == 3
+
+def test_get_gives_up(flaky):
+    dot = connect(flaky, retries=1)
+    flaky.failures = 5
+    with pytest.raises(requests.exceptions.HTTPError):
+        dot.get_xml('/vlan')
+    assert len(flaky.requests) == 2
+
+def test_post_is_not_retried(flaky):
+    dot = connect(flaky, retries=3)
+    flaky.failures = 1
+    with pytest.raises(requests.exceptions.HTTPError):
+        dot.create_object('vlan', {'vid': '10'})
+    assert flaky.requests == [('POST', '/netdot/rest/vlan')]
+
+def test_timeout(flaky):
+    dot = connect(flaky, retries=0, timeout=0.1)
+    flaky.delay = 0.5
+    start = time.time()
+    # A read timeout with retries configured surfaces as a
+    # ConnectionError, so check the time taken instead
+    with pytest.raises(requests.exceptions.RequestException):
+        dot.get_xml('/vlan')
+    assert time.time() - start < 0.4
+
+def test_pool_sizing(flaky):
+    dot = connect(flaky, workers=32, pool_connections=4)
+    assert dot.pool_maxsize == 32
+    assert dot.http.get_adapter('http://x')._pool_maxsize == 32
+    assert connect(flaky, pool_maxsize=5).pool_maxsize == 5
+
+def test_jittered_backoff():
+    retry = Client.JitterRetry(total=5, backoff_factor=1).increment(
+        'GET', '/', error=requests.packages.urllib3.exceptions.ProtocolError())
+    retry = retry.increment('GET', '/', error=requests.packages.urllib3.exceptions.ProtocolError())
+    delays = set(retry.get_backoff_time() for i in range(20))
+    assert len(delays) > 1
+    assert all(0 <= delay <= 2 for delay in delays)